@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарки конвертации субтитров и загрузки каналов
+
+python -m benchmarks.corpus      - генерация синтетических VTT файлов
+python -m benchmarks.bench_convert - скорость разбора и сборки абзацев
+python -m benchmarks.bench_e2e   - загрузка канала с локального тестового сервера
+"""
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Микробенчмарки конвертации VTT
+
+Для каждого вида корпуса измеряются разбор блоков (iter_cues), сборка абзацев
+(iter_paragraphs), выбор фрагментов по времени из CueTable и полная
+конвертация файла: фраз (или фрагментов) в секунду, МБ в секунду и пиковая
+память (tracemalloc, отдельным проходом, чтобы не искажать время).
+"""
+
+import argparse
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from ytsubs.cues import CueTable
+from ytsubs.vtt import OUTPUT_FORMATS, convert_vtt_to_txt, iter_cues, iter_paragraphs, iter_text_lines
+
+from .corpus import CORPUS_KINDS, write_vtt
+
+
+CLIP_COUNT = 100
+
+
+def best_time(func, repeat):
+    """Лучшее время из нескольких запусков"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func):
+    """Пиковое выделение памяти при вызове, в байтах"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_kind(kind, size, repeat, directory, subtitle_format):
+    """Замеры для одного вида корпуса; возвращает список строк результата"""
+    vtt_file = os.path.join(directory, f'{kind}.vtt')
+    txt_file = os.path.join(directory, f'{kind}.txt')
+    file_size = write_vtt(vtt_file, CORPUS_KINDS[kind](size, 0))
+
+    with open(vtt_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    cue_count = text.count('-->')
+
+    def parse():
+        with open(vtt_file, 'r', encoding='utf-8') as src:
+            for _ in iter_cues(src):
+                pass
+
+    # Абзацы собираются из уже разобранных строк, чтобы замер не включал разбор
+    text_lines = list(iter_text_lines(iter_cues(io.StringIO(text)), 'without_timings'))
+
+    def paragraphs():
+        for _ in iter_paragraphs(text_lines):
+            pass
+
+    # Фрагменты по 3,5 минуты, равномерно по всей длине субтитров
+    table = CueTable.from_vtt(io.StringIO(text))
+    duration = max(table.end_ms, default=0)
+    windows = [(duration * i // CLIP_COUNT, duration * i // CLIP_COUNT + 210000) for i in range(CLIP_COUNT)]
+
+    def clips():
+        for start_ms, end_ms in windows:
+            table.slice(start_ms, end_ms)
+
+    def convert():
+        convert_vtt_to_txt(vtt_file, txt_file, subtitle_format)
+
+    results = []
+    for stage, func, units in (
+        ('разбор', parse, cue_count),
+        ('абзацы', paragraphs, len(text_lines)),
+        ('фрагменты', clips, CLIP_COUNT),
+        ('конвертация', convert, cue_count),
+    ):
+        elapsed = best_time(func, repeat)
+        results.append((kind, stage, units / elapsed, file_size / elapsed / 1024 / 1024, peak_memory(func)))
+    return file_size, cue_count, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_convert', description="Скорость конвертации VTT")
+    parser.add_argument('--cues', type=int, default=5000, help="фраз в файлах manual и auto (по умолчанию: %(default)s)")
+    parser.add_argument('--livestream-hours', type=float, default=4, help="длительность трансляции (по умолчанию: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3, help="повторов, берется лучший (по умолчанию: %(default)s)")
+    parser.add_argument('-f', '--format', dest='subtitle_format', default='with_timings',
+                        choices=tuple(OUTPUT_FORMATS), help="формат полной конвертации")
+    args = parser.parse_args(argv)
+
+    sizes = {'manual': args.cues, 'auto': args.cues, 'livestream': args.livestream_hours}
+
+    print(f"{'корпус':<11} {'этап':<12} {'ед./с':>12} {'МБ/с':>9} {'пик памяти':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for kind, size in sizes.items():
+            if not size:
+                continue
+            file_size, cue_count, results = bench_kind(kind, size, args.repeat, directory, args.subtitle_format)
+            for kind_name, stage, rate, mb_rate, peak in results:
+                print(f"{kind_name:<11} {stage:<12} {rate:>12,.0f} {mb_rate:>9.1f} {peak / 1024:>9,.0f} КБ")
+            print(f"{'':<11} ({cue_count} блоков, {file_size / 1024 / 1024:.1f} МБ)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Сквозной бенчмарк загрузки канала без доступа к сети
+
+Локальный HTTP-сервер отдает страницы списка канала, информацию о видео и
+субтитры (timedtext) с заданной задержкой. Вместо yt-dlp используется
+упрощенная сессия, которая обращается к этому серверу, остальной путь
+(очередь загрузки, журнал, конвертация) - настоящий SubtitlesDownloader.
+Результат - видео в секунду при разном числе параллельных загрузок.
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from ytsubs.engine import SUBTITLE_FORMATS, DownloadOptions, SubtitlesDownloader
+
+from .corpus import iter_auto_vtt, iter_manual_vtt
+
+CHANNEL_URL = 'https://www.youtube.com/@benchmark'
+PAGE_SIZE = 30  # Столько видео YouTube отдает на одной странице списка
+DISTINCT_TRACKS = 8
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Ответы тестового сервера: /channel?page=N, /video?v=ID, /timedtext?v=ID"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.latency)
+
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == '/channel':
+            page = int(query.get('page', 0))
+            ids = range(page * PAGE_SIZE, min((page + 1) * PAGE_SIZE, server.video_count))
+            body = json.dumps({
+                'entries': [{'id': f'bench{i:06d}', 'title': f'Видео {i}'} for i in ids],
+                'has_more': (page + 1) * PAGE_SIZE < server.video_count,
+            }).encode('utf-8')
+            content_type = 'application/json'
+        elif url.path == '/video':
+            video_id = query['v']
+            body = json.dumps({
+                'id': video_id,
+                'title': f'Видео {video_id}',
+                'uploader': 'Benchmark',
+                'webpage_url': f'https://www.youtube.com/watch?v={video_id}',
+                'subtitles': {},
+                'automatic_captions': {
+                    'ru': [{'ext': 'vtt', 'url': f'{server.base_url}/timedtext?v={video_id}&lang=ru&fmt=vtt'}],
+                },
+            }).encode('utf-8')
+            content_type = 'application/json'
+        elif url.path == '/timedtext':
+            body = server.tracks[int(query['v'][-6:]) % len(server.tracks)]
+            content_type = 'text/vtt; charset=utf-8'
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(video_count, latency, cues):
+    """Запуск тестового сервера в фоновом потоке"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.video_count = video_count
+    server.latency = latency
+    server.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    # Половина дорожек - обычные субтитры, половина - автоматические
+    server.tracks = [
+        ''.join((iter_auto_vtt if i % 2 else iter_manual_vtt)(cues, i)).encode('utf-8')
+        for i in range(DISTINCT_TRACKS)
+    ]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class StandInSession:
+    """Замена YoutubeDLSession, которая получает данные с тестового сервера"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def _get(self, path):
+        with urllib.request.urlopen(self.base_url + path, timeout=30) as response:
+            return response.read()
+
+    def _iter_channel(self):
+        page = 0
+        while True:
+            data = json.loads(self._get(f'/channel?page={page}'))
+            for entry in data['entries']:
+                yield {
+                    '_type': 'url',
+                    'ie_key': 'Youtube',
+                    'id': entry['id'],
+                    'title': entry['title'],
+                    'url': f"https://www.youtube.com/watch?v={entry['id']}",
+                }
+            if not data['has_more']:
+                return
+            page += 1
+
+    def extract_info(self, url, download=False, process=True, outtmpl=None, **params):
+        query = parse_qs(urlparse(url).query)
+        if 'v' in query:
+            return json.loads(self._get(f"/video?v={query['v'][0]}"))
+        return {'_type': 'playlist', 'id': 'benchmark', 'title': 'Benchmark', 'entries': self._iter_channel()}
+
+    def process_ie_result(self, info, download=False, outtmpl=None, subtitleslangs=None, **params):
+        """Сохранение дорожки в файл, как это делает yt-dlp"""
+        requested = {}
+        for lang in subtitleslangs or []:
+            tracks = info['subtitles'].get(lang) or info['automatic_captions'].get(lang)
+            filepath = outtmpl % {'ext': f'{lang}.vtt'}
+            with urllib.request.urlopen(tracks[0]['url'], timeout=30) as response, open(filepath, 'wb') as f:
+                f.write(response.read())
+            requested[lang] = dict(tracks[0], filepath=filepath)
+        return dict(info, requested_subtitles=requested)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class BenchmarkDownloader(SubtitlesDownloader):
+    """SubtitlesDownloader, работающий с тестовым сервером"""
+
+    def __init__(self, options, base_url):
+        super().__init__(options)
+        self.base_url = base_url
+
+    def create_ydl_session(self):
+        return StandInSession(self.base_url)
+
+
+def run_once(base_url, video_count, workers, in_memory, subtitle_format):
+    """Один запуск загрузки канала в пустую папку; возвращает (время, успешно)"""
+    output_dir = tempfile.mkdtemp(prefix='subtitles_bench_')
+    try:
+        options = DownloadOptions(
+            output_dir=output_dir,
+            subtitle_format=subtitle_format,
+            max_videos=video_count,
+            max_workers=workers,
+            in_memory=in_memory,
+            request_rate=0,  # Измеряется сам движок, а не ограничение запросов
+        )
+        start = time.perf_counter()
+        success = BenchmarkDownloader(options, base_url).run(CHANNEL_URL)
+        return time.perf_counter() - start, success
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_e2e', description="Скорость загрузки канала")
+    parser.add_argument('--videos', type=int, default=200, help="видео на канале (по умолчанию: %(default)s)")
+    parser.add_argument('--workers', default='1,2,4,8,16', help="числа параллельных загрузок (по умолчанию: %(default)s)")
+    parser.add_argument('--latency-ms', type=float, default=50, help="задержка ответа сервера (по умолчанию: %(default)s)")
+    parser.add_argument('--cues', type=int, default=600, help="фраз в одной дорожке (по умолчанию: %(default)s)")
+    parser.add_argument('--in-memory', action='store_true', help="загружать субтитры в память (нужен requests)")
+    parser.add_argument('-f', '--format', dest='subtitle_format', default='with_timings',
+                        choices=SUBTITLE_FORMATS)
+    args = parser.parse_args(argv)
+
+    server = start_server(args.videos, args.latency_ms / 1000, args.cues)
+    try:
+        print(f"Тестовый сервер: {server.base_url}, задержка {args.latency_ms:g} мс, видео: {args.videos}")
+        print(f"{'потоков':>8} {'время, с':>10} {'видео/с':>9} {'успешно':>9}")
+        for workers in (int(value) for value in args.workers.split(',')):
+            elapsed, success = run_once(server.base_url, args.videos, workers, args.in_memory, args.subtitle_format)
+            print(f"{workers:>8} {elapsed:>10.2f} {args.videos / elapsed:>9.1f} {success:>9}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
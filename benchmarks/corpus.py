@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Синтетический корпус субтитров WebVTT
+
+Три вида файлов:
+- manual: обычные субтитры, по одной-две строки в блоке;
+- auto: автоматические субтитры YouTube с "бегущей" строкой, тегами <c>
+  и повтором предыдущей строки в каждом блоке;
+- livestream: автоматические субтитры многочасовой трансляции.
+"""
+
+import argparse
+import os
+import random
+
+WORDS = (
+    "и в не на я что тот быть с а весь это как она по но они к у ты из мы за вы так же от сказать "
+    "the be to of and a in that have it for not on with he as you do at this but his by from they we "
+    "video channel today look really think know people time year good new first way make"
+).split()
+
+
+def format_timestamp(ms):
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{ms:03d}"
+
+
+def _phrase(rng, min_words=3, max_words=9):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    text = ' '.join(words)
+    return text + rng.choice(('', '', '', '.', '?', '!'))
+
+
+def iter_manual_vtt(cue_count, seed=0):
+    """Обычные субтитры: нумерованные блоки с одной-двумя строками текста"""
+    rng = random.Random(seed)
+    yield "WEBVTT\n\n"
+    start = 0
+    for i in range(1, cue_count + 1):
+        duration = rng.randint(1200, 4500)
+        yield f"{i}\n{format_timestamp(start)} --> {format_timestamp(start + duration)}\n"
+        for _ in range(rng.randint(1, 2)):
+            yield _phrase(rng) + "\n"
+        yield "\n"
+        start += duration + rng.randint(0, 400)
+
+
+def iter_auto_vtt(cue_count, seed=0):
+    """Автоматические субтитры YouTube: каждая фраза повторяется в следующем блоке"""
+    rng = random.Random(seed)
+    yield "WEBVTT\nKind: captions\nLanguage: ru\n\n"
+    start = 0
+    previous = None
+    for _ in range(cue_count):
+        duration = rng.randint(1500, 4000)
+        words = _phrase(rng, 4, 8).split()
+        tagged = words[0] + ''.join(
+            f"<{format_timestamp(start + (j + 1) * duration // len(words))}><c> {word}</c>"
+            for j, word in enumerate(words[1:])
+        )
+        timing = f"{format_timestamp(start)} --> {format_timestamp(start + duration)} align:start position:0%\n"
+
+        # Блок с новой фразой: предыдущая строка сверху, новая с пословными таймингами снизу
+        yield timing
+        yield (previous if previous else " ") + "\n"
+        yield tagged + "\n\n"
+
+        # Короткий переходный блок, в котором новая строка повторяется без тегов
+        end = start + duration
+        yield f"{format_timestamp(end)} --> {format_timestamp(end + 10)} align:start position:0%\n"
+        previous = ' '.join(words)
+        yield previous + "\n \n\n"
+        start = end + 10
+
+
+def iter_livestream_vtt(hours, seed=0):
+    """Автоматические субтитры многочасовой трансляции (около 1300 фраз в час)"""
+    return iter_auto_vtt(int(hours * 1300), seed)
+
+
+CORPUS_KINDS = {
+    'manual': lambda size, seed: iter_manual_vtt(size, seed),
+    'auto': lambda size, seed: iter_auto_vtt(size, seed),
+    'livestream': lambda size, seed: iter_livestream_vtt(size, seed),
+}
+
+
+def write_vtt(path, chunks):
+    """Запись сгенерированного файла, возвращает размер в байтах"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    return os.path.getsize(path)
+
+
+def generate_corpus(directory, files=20, cues=400, livestream_hours=3, seed=0):
+    """Набор файлов всех видов; возвращает список (вид, путь, размер)"""
+    os.makedirs(directory, exist_ok=True)
+    corpus = []
+    for i in range(files):
+        for kind in ('manual', 'auto'):
+            path = os.path.join(directory, f'{kind}_{i:04d}.vtt')
+            corpus.append((kind, path, write_vtt(path, CORPUS_KINDS[kind](cues, seed + i))))
+    if livestream_hours:
+        path = os.path.join(directory, 'livestream.vtt')
+        corpus.append(('livestream', path, write_vtt(path, iter_livestream_vtt(livestream_hours, seed))))
+    return corpus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.corpus', description="Генерация синтетических VTT файлов")
+    parser.add_argument('directory', help="папка для файлов")
+    parser.add_argument('--files', type=int, default=20, help="файлов каждого вида (по умолчанию: %(default)s)")
+    parser.add_argument('--cues', type=int, default=400, help="фраз в файле (по умолчанию: %(default)s)")
+    parser.add_argument('--livestream-hours', type=float, default=3, help="длительность трансляции (по умолчанию: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    corpus = generate_corpus(args.directory, args.files, args.cues, args.livestream_hours, args.seed)
+    total = sum(size for _, _, size in corpus)
+    print(f"Создано файлов: {len(corpus)}, {total / 1024 / 1024:.1f} МБ в {args.directory}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Выборка фраз CueTable по времени"""
+
+import unittest
+
+from ytsubs.cues import CueTable
+from ytsubs.vtt import Cue
+
+
+def make_table(*spans):
+    return CueTable.from_cues(Cue(start, end, [f"{start}-{end}"]) for start, end in spans)
+
+
+def brute_force(table, start_ms, end_ms):
+    return [row for row in range(len(table)) if table._overlaps(row, start_ms, end_ms)]
+
+
+class CueTableRowsTest(unittest.TestCase):
+    def test_long_cue_before_short_ones(self):
+        table = make_table((0, 100000), (1000, 2000), (55000, 56000))
+        self.assertEqual(list(table.rows(50000, 60000)), [0, 2])
+        self.assertEqual([cue.start_ms for cue in table.slice(50000, 60000)], [0, 55000])
+
+    def test_overlapping_previous_cue(self):
+        table = make_table((0, 2000), (1500, 3000), (3000, 4000))
+        self.assertEqual(table.rows(2500, 3500), range(1, 3))
+        self.assertEqual(list(table.rows(3000, 3500)), [2])
+
+    def test_matches_brute_force(self):
+        spans = [(0, 100000), (1000, 2000), (1500, 40000), (None, None), (55000, 56000), (56000, 57000), (90000, 120000)]
+        table = make_table(*spans)
+        bounds = [None, 0, 1000, 1999, 2000, 39999, 50000, 56000, 100000, 130000]
+        for start_ms in bounds:
+            for end_ms in bounds:
+                if start_ms is not None and end_ms is not None and start_ms >= end_ms:
+                    continue
+                with self.subTest(start_ms=start_ms, end_ms=end_ms):
+                    self.assertEqual(list(table.rows(start_ms, end_ms)), brute_force(table, start_ms, end_ms))
+                    sliced = table.slice(start_ms, end_ms)
+                    self.assertEqual(list(sliced.rows(start_ms, end_ms)), list(range(len(sliced))))
+
+
+if __name__ == '__main__':
+    unittest.main()
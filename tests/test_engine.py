@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Общие ресурсы папок каналов в SubtitlesDownloader"""
+
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from ytsubs import engine
+from ytsubs.engine import DownloadOptions, SubtitlesDownloader
+
+
+class AcquireFolderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.downloader = SubtitlesDownloader(DownloadOptions(output_dir=self.directory, pack_output=True))
+
+    def test_failed_open_closes_opened_resources(self):
+        error = None
+        with mock.patch.object(engine, 'DownloadManifest', side_effect=OSError("disk full")):
+            try:
+                self.downloader._acquire_folder(self.directory)
+            except OSError as e:
+                # Трассировка держит кадры: архив должен быть закрыт явно, а не сборщиком мусора
+                error = e
+        self.assertIsNotNone(error)
+        self.assertEqual(self.downloader.transcript_archives, {})
+        self.assertEqual(self.downloader._folders, {})
+
+        manifest = self.downloader._acquire_folder(self.directory)
+        self.assertIs(self.downloader._acquire_folder(self.directory), manifest)
+        self.downloader._release_folder(self.directory)
+        self.downloader._release_folder(self.directory)
+        self.assertEqual(self.downloader._folders, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
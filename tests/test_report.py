@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Замеры этапов в отчете о запуске"""
+
+import time
+import unittest
+
+from ytsubs.report import STAGE_SAMPLE_SIZE, RunReport, StageSamples, percentile
+
+
+class StageSamplesTest(unittest.TestCase):
+    def test_sample_is_bounded_and_uniform(self):
+        samples = StageSamples()
+        count = STAGE_SAMPLE_SIZE * 7 + 3
+        for i in range(count):
+            samples.add(float(i))
+        self.assertEqual(samples.count, count)
+        self.assertEqual(samples.total, sum(range(count)))
+        self.assertEqual(samples.max, count - 1)
+        self.assertLess(len(samples.sample), STAGE_SAMPLE_SIZE * 2)
+        self.assertGreaterEqual(len(samples.sample), STAGE_SAMPLE_SIZE)
+        median = percentile(sorted(samples.sample), 0.5)
+        self.assertAlmostEqual(median / count, 0.5, delta=0.01)
+
+
+class RunReportTest(unittest.TestCase):
+    def test_nested_stage_time_is_exclusive(self):
+        report = RunReport()
+        report.start()
+        with report.stage('outer'):
+            time.sleep(0.02)
+            with report.stage('inner'):
+                time.sleep(0.05)
+        report.finish()
+        stages = report.summary()['stages']
+        self.assertGreaterEqual(stages['inner']['total'], 0.05)
+        self.assertLess(stages['outer']['total'], 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
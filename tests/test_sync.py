@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Синхронизация канала: сдвиг отметки после запуска"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ytsubs.engine import THROTTLED, DownloadOptions, SubtitlesDownloader
+from ytsubs.sync import ChannelSyncState, SyncStateStore
+
+
+CHANNEL_URL = 'https://www.youtube.com/@test'
+
+
+def make_entries(*video_ids):
+    return [
+        {'id': video_id, 'title': video_id, 'url': f'https://www.youtube.com/watch?v={video_id}'}
+        for video_id in video_ids
+    ]
+
+
+class ChannelSyncStateTest(unittest.TestCase):
+    def test_first_run_commits_without_catching_up(self):
+        state = ChannelSyncState()
+        for entry in make_entries('v3', 'v2'):
+            state.observe(entry)
+        self.assertTrue(state.commit())
+        self.assertEqual(state.known_ids, ['v3', 'v2'])
+
+    def test_caught_up_run_puts_new_ids_first(self):
+        state = ChannelSyncState({'known_ids': ['v2', 'v1']})
+        state.observe(make_entries('v3')[0])
+        state.caught_up = True
+        self.assertTrue(state.commit())
+        self.assertEqual(state.known_ids, ['v3', 'v2', 'v1'])
+
+    def test_listing_cut_short_keeps_anchor(self):
+        state = ChannelSyncState({'known_ids': ['v1']})
+        for entry in make_entries('v4', 'v3'):
+            state.observe(entry)
+        self.assertFalse(state.commit())
+        self.assertEqual(state.known_ids, ['v1'])
+        self.assertTrue(state.is_known({'id': 'v1'}))
+        self.assertFalse(state.is_known({'id': 'v4'}))
+
+
+class SyncRunTest(unittest.TestCase):
+    """Запуски с синхронизацией без обращения к сети (загрузка видео подменяется)"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.throttled = set()
+        self.downloaded = []
+
+    def download(self, video_ids, max_videos=50):
+        options = DownloadOptions(output_dir=self.directory, sync=True, max_workers=1, max_videos=max_videos,
+                                  request_rate=0, cache_ttl=0)
+        downloader = SubtitlesDownloader(options)
+
+        def fake_download(video_url, video_title, output_dir, video_id=None, **kwargs):
+            if video_id in self.throttled:
+                return THROTTLED
+            self.downloaded.append(video_id)
+            with open(os.path.join(output_dir, f'{video_id}.txt'), 'w', encoding='utf-8') as f:
+                f.write(video_title)
+            kwargs['manifest'].record(video_id, 'ru', options.subtitle_format, 'done', 'manual',
+                                      f'{video_id}.txt', video_title)
+            return True
+
+        downloader.download_subtitles_for_video = fake_download
+        info = {'title': 'Test', 'entries': make_entries(*video_ids)}
+        return downloader.download_channel(downloader.open_channel(CHANNEL_URL, info, self.directory))
+
+    def known_ids(self):
+        return SyncStateStore(self.directory).get(CHANNEL_URL).known_ids
+
+    def test_new_videos_only(self):
+        self.download(['v2', 'v1'])
+        self.download(['v3', 'v2', 'v1'])
+        self.assertEqual(self.downloaded, ['v2', 'v1', 'v3'])
+        self.assertEqual(self.known_ids(), ['v3', 'v2', 'v1'])
+
+    def test_throttled_video_is_retried_next_run(self):
+        self.throttled = {'v2'}
+        self.assertEqual(self.download(['v2', 'v1']), 1)
+        self.assertEqual(self.known_ids(), [])
+
+        self.throttled = set()
+        self.assertEqual(self.download(['v2', 'v1']), 1)
+        self.assertEqual(self.downloaded, ['v1', 'v2'])
+        self.assertEqual(self.known_ids(), ['v2', 'v1'])
+
+    def test_max_videos_cut_keeps_anchor(self):
+        self.download(['v1'])
+        self.download(['v4', 'v3', 'v2', 'v1'], max_videos=2)
+        self.assertEqual(self.known_ids(), ['v1'])
+
+        self.download(['v4', 'v3', 'v2', 'v1'])
+        self.assertEqual(self.downloaded, ['v1', 'v4', 'v3', 'v2'])
+        self.assertEqual(self.known_ids(), ['v4', 'v3', 'v2', 'v1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
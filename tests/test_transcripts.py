@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Сжатый архив текстов канала: дописывание шардов и восстановление"""
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from ytsubs.transcripts import JOURNAL_FILENAME, TranscriptArchive, TranscriptArchiveWriter
+
+
+def shard_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.startswith('transcripts-'))
+
+
+class TranscriptArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def crash(self, writer):
+        """Аварийное завершение: файлы остаются открытыми и недописанными в индекс"""
+        writer._shard.close()
+        writer._journal.close()
+
+    def test_runs_append_to_last_shard(self):
+        for run in range(3):
+            with TranscriptArchiveWriter(self.directory) as writer:
+                writer.add(f'video{run}.txt', f'text {run}', video_id=f'v{run}')
+        self.assertEqual(shard_files(self.directory), ['transcripts-0001.jsonl.gz'])
+
+        archive = TranscriptArchive(self.directory)
+        self.assertEqual([archive.read(f'video{run}.txt') for run in range(3)], ['text 0', 'text 1', 'text 2'])
+        with gzip.open(os.path.join(self.directory, 'transcripts-0001.jsonl.gz'), 'rt', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_new_shard_after_size_limit(self):
+        with TranscriptArchiveWriter(self.directory, shard_max_bytes=1) as writer:
+            writer.add('a.txt', 'a')
+        with TranscriptArchiveWriter(self.directory, shard_max_bytes=1) as writer:
+            writer.add('b.txt', 'b')
+        self.assertEqual(shard_files(self.directory), ['transcripts-0001.jsonl.gz', 'transcripts-0002.jsonl.gz'])
+        self.assertEqual(TranscriptArchive(self.directory).read('b.txt'), 'b')
+
+    def test_recovery_keeps_journaled_texts_and_drops_tail(self):
+        with TranscriptArchiveWriter(self.directory) as writer:
+            writer.add('a.txt', 'a')
+        writer = TranscriptArchiveWriter(self.directory)
+        writer.add('b.txt', 'b')
+        # Недописанный текст после последней записи журнала
+        writer._shard.write(b'\x1f\x8b partial')
+        self.crash(writer)
+        self.assertEqual(TranscriptArchive(self.directory).names(), ['a.txt'])
+
+        with TranscriptArchiveWriter(self.directory) as writer:
+            writer.add('c.txt', 'c')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, JOURNAL_FILENAME)))
+        archive = TranscriptArchive(self.directory)
+        self.assertEqual([archive.read(name) for name in ('a.txt', 'b.txt', 'c.txt')], ['a', 'b', 'c'])
+        with gzip.open(os.path.join(self.directory, 'transcripts-0001.jsonl.gz'), 'rt', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_recovery_of_finished_shard_without_index(self):
+        writer = TranscriptArchiveWriter(self.directory, shard_max_bytes=1)
+        writer.add('a.txt', 'a')
+        # Сбой после записи шарда, но до записи индекса
+        writer._entries.clear()
+        os.remove(os.path.join(self.directory, 'transcripts.idx.json'))
+        with open(os.path.join(self.directory, JOURNAL_FILENAME), 'w', encoding='utf-8') as f:
+            f.write('{"shard": "transcripts-0001.jsonl.gz", "offset": 0, "length": %d, "name": "a.txt"}\n'
+                    % os.path.getsize(os.path.join(self.directory, 'transcripts-0001.jsonl.gz')))
+
+        TranscriptArchiveWriter(self.directory).close()
+        self.assertEqual(TranscriptArchive(self.directory).read('a.txt'), 'a')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Удаление повторов и склейка "бегущих" строк при конвертации VTT"""
+
+import unittest
+
+from ytsubs.vtt import Cue, dedup_cues, iter_cues, overlap_length
+
+
+def texts(cues):
+    return [line for cue in cues for line in cue.lines]
+
+
+def cue(seconds, *lines):
+    start_ms = None if seconds is None else int(seconds * 1000)
+    return Cue(start_ms, None if start_ms is None else start_ms + 1000, list(lines))
+
+
+class OverlapLengthTest(unittest.TestCase):
+    def test_longest_suffix_that_starts_new_line(self):
+        self.assertEqual(overlap_length('a b c d'.split(), 'c d e'.split()), 2)
+        self.assertEqual(overlap_length('a b a b'.split(), 'a b a b c'.split()), 4)
+        self.assertEqual(overlap_length('a b c'.split(), 'b d'.split()), 0)
+
+    def test_new_line_shorter_than_overlap(self):
+        self.assertEqual(overlap_length('a b c'.split(), 'b c'.split()), 2)
+        self.assertEqual(overlap_length('a b c'.split(), []), 0)
+        self.assertEqual(overlap_length([], 'a'.split()), 0)
+
+
+class DedupCuesTest(unittest.TestCase):
+    def test_repeat_inside_window_is_dropped(self):
+        cues = [cue(0, "Привет"), cue(1, "Привет"), cue(2, "Как дела")]
+        self.assertEqual(texts(dedup_cues(cues, 10)), ["Привет", "Как дела"])
+
+    def test_window_boundary(self):
+        # Ровно dedup_window после последнего появления - еще повтор, на миллисекунду позже - уже нет
+        self.assertEqual(texts(dedup_cues([cue(0, "Да."), cue(10, "Да.")], 10)), ["Да."])
+        self.assertEqual(
+            texts(dedup_cues([cue(0, "Да."), Cue(10001, 11001, ["Да."])], 10)),
+            ["Да.", "Да."],
+        )
+
+    def test_window_slides_with_each_repeat(self):
+        cues = [cue(0, "Припев"), cue(8, "Припев"), cue(16, "Припев"), cue(40, "Припев")]
+        self.assertEqual(texts(dedup_cues(cues, 10)), ["Припев", "Припев"])
+
+    def test_disabled(self):
+        cues = [cue(0, "Да."), cue(1, "Да.")]
+        self.assertEqual(texts(dedup_cues(cues, 0)), ["Да.", "Да."])
+
+    def test_cues_without_time_share_previous_start(self):
+        cues = [cue(0, "Первая"), cue(None, "Первая"), cue(None, "Вторая")]
+        self.assertEqual(texts(dedup_cues(cues, 10)), ["Первая", "Вторая"])
+
+    def test_rolling_caption_keeps_only_new_words(self):
+        cues = [
+            cue(0, "сегодня мы поговорим о том"),
+            cue(2, "поговорим о том как работает"),
+            cue(4, "о том как работает кеш"),
+        ]
+        self.assertEqual(
+            texts(dedup_cues(cues, 10)),
+            ["сегодня мы поговорим о том", "как работает", "кеш"],
+        )
+
+    def test_short_overlap_needs_whole_previous_line(self):
+        # Два совпавших слова - случайность, если это не вся предыдущая строка
+        cues = [cue(0, "и вот мы здесь"), cue(2, "мы здесь снова")]
+        self.assertEqual(texts(dedup_cues(cues, 10)), ["и вот мы здесь", "мы здесь снова"])
+        cues = [cue(0, "ну да"), cue(2, "ну да конечно")]
+        self.assertEqual(texts(dedup_cues(cues, 10)), ["ну да", "конечно"])
+
+    def test_rolling_merge_only_inside_window(self):
+        cues = [cue(0, "раз два три четыре"), cue(11, "два три четыре пять")]
+        self.assertEqual(texts(dedup_cues(cues, 10)), ["раз два три четыре", "два три четыре пять"])
+
+    def test_vtt_input(self):
+        vtt = [
+            "WEBVTT", "",
+            "00:00:00.000 --> 00:00:02.000", "<c>раз два три</c>", "",
+            "00:00:02.000 --> 00:00:04.000", "раз два три", "четыре &amp;", "",
+            "00:00:04.000 --> 00:00:06.000", "раз два три", "",
+        ]
+        self.assertEqual(texts(iter_cues(vtt)), ["раз два три", "четыре"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,23 +3,25 @@
 """
 YouTube Subtitles Downloader
 Программа для загрузки субтитров с YouTube видео или целых каналов
+
+Графический интерфейс над движком ytsubs (запуск без интерфейса: python -m ytsubs)
 """
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
+import queue
 import os
-import re
-from urllib.parse import urlparse, parse_qs
-import requests
-import json
 from datetime import datetime
 
-try:
-    import yt_dlp
-except ImportError:
-    messagebox.showerror("Ошибка", "Необходимо установить yt-dlp:\npip install yt-dlp")
-    exit(1)
+from ytsubs.cache import DEFAULT_CACHE_TTL
+from ytsubs.engine import DownloadOptions, SubtitlesDownloader, is_yt_dlp_available
+from ytsubs.jobs import split_urls
+from ytsubs.logs import LOG_FILENAME, close_log_file, open_log_file
+
+LOG_POLL_INTERVAL_MS = 100  # Как часто интерфейс забирает накопленные сообщения
+LOG_BATCH_SIZE = 500  # Максимум сообщений за один проход, чтобы интерфейс не подвисал
+LOG_MAX_LINES = 5000  # В окне лога хранятся только последние строки
 
 
 class YouTubeSubtitlesDownloader:
@@ -34,10 +36,30 @@ class YouTubeSubtitlesDownloader:
         self.language_var = tk.StringVar(value="ru")
         self.auto_translate_var = tk.BooleanVar(value=False)
         self.max_videos_var = tk.StringVar(value="50")
+        self.max_workers_var = tk.StringVar(value="4")  # Количество видео, обрабатываемых параллельно
+        self.in_memory_var = tk.BooleanVar(value=False)  # Загрузка субтитров в память без временных VTT
+        self.retry_failed_var = tk.BooleanVar(value=False)  # Повтор видео, не загрузившихся в прошлый раз
+        self.sync_var = tk.BooleanVar(value=False)  # Только новые видео с прошлой синхронизации
+        self.channel_archive_var = tk.BooleanVar(value=False)  # Сводный файл всех субтитров канала
+        self.search_index_var = tk.BooleanVar(value=False)  # Поисковый индекс в папке сохранения
+        self.pack_output_var = tk.BooleanVar(value=False)  # Сжатый архив канала вместо отдельных файлов
+        self.use_cache_var = tk.BooleanVar(value=True)  # Брать информацию о видео из кеша
+        self.cache_hours_var = tk.StringVar(value="24")  # Время жизни кеша, 0 - без кеша
         self.subtitle_format_var = tk.StringVar(value="with_timings")  # with_timings или without_timings
+        self.log_to_file_var = tk.BooleanVar(value=False)  # Дублировать лог в файл в папке сохранения
+        self.resume_var = tk.BooleanVar(value=False)  # Продолжить незавершенные задания прошлых запусков
         self.is_downloading = False
+        self.downloader = None  # Создается на время одного запуска загрузки
+        
+        # Сообщения и обновления интерфейса из рабочих потоков передаются через очереди,
+        # а применяются только в главном потоке Tk
+        self.log_queue = queue.Queue()
+        self.ui_queue = queue.Queue()
+        self.pending_progress = None
+        self.file_logger = None
         
         self.setup_ui()
+        self.root.after(LOG_POLL_INTERVAL_MS, self.process_queues)
         
     def setup_ui(self):
         # Главный фрейм
@@ -50,7 +72,7 @@ class YouTubeSubtitlesDownloader:
         main_frame.columnconfigure(1, weight=1)
         
         # URL ввод
-        ttk.Label(main_frame, text="URL видео или канала:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        ttk.Label(main_frame, text="URL видео или каналов:").grid(row=0, column=0, sticky=tk.W, pady=5)
         self.url_entry = ttk.Entry(main_frame, textvariable=self.url_var, width=60)
         self.url_entry.grid(row=0, column=1, columnspan=2, sticky=(tk.W, tk.E), pady=5, padx=(10, 0))
         
@@ -102,6 +124,20 @@ class YouTubeSubtitlesDownloader:
             value="without_timings"
         ).pack(side=tk.LEFT, padx=(10, 0))
         
+        ttk.Radiobutton(
+            format_frame, 
+            text="SRT", 
+            variable=self.subtitle_format_var, 
+            value="srt"
+        ).pack(side=tk.LEFT, padx=(10, 0))
+        
+        ttk.Radiobutton(
+            format_frame, 
+            text="JSONL", 
+            variable=self.subtitle_format_var, 
+            value="jsonl"
+        ).pack(side=tk.LEFT, padx=(10, 0))
+        
         # Обновляем значение по умолчанию
         self.language_var.set('ru - Русский')
         
@@ -110,13 +146,71 @@ class YouTubeSubtitlesDownloader:
         max_videos_entry = ttk.Entry(settings_frame, textvariable=self.max_videos_var, width=10)
         max_videos_entry.grid(row=1, column=1, sticky=tk.W, pady=2, padx=(10, 0))
         
+        # Количество параллельных загрузок
+        ttk.Label(settings_frame, text="Параллельных загрузок:").grid(row=1, column=2, sticky=tk.W, pady=2, padx=(20, 0))
+        max_workers_entry = ttk.Entry(settings_frame, textvariable=self.max_workers_var, width=10)
+        max_workers_entry.grid(row=1, column=3, sticky=tk.W, pady=2, padx=(10, 0))
+        
+        ttk.Checkbutton(
+            settings_frame,
+            text="Загружать субтитры в память (без временных VTT файлов)",
+            variable=self.in_memory_var
+        ).grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=2)
+        
+        ttk.Checkbutton(
+            settings_frame,
+            text="Повторить неудачные загрузки",
+            variable=self.retry_failed_var
+        ).grid(row=2, column=2, columnspan=2, sticky=tk.W, pady=2, padx=(20, 0))
+        
+        ttk.Checkbutton(
+            settings_frame,
+            text="Только новые видео (синхронизация канала)",
+            variable=self.sync_var
+        ).grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=2)
+        
+        ttk.Checkbutton(
+            settings_frame,
+            text="Сводный файл канала (subtitles.cues)",
+            variable=self.channel_archive_var
+        ).grid(row=3, column=2, columnspan=2, sticky=tk.W, pady=2, padx=(20, 0))
+        
+        ttk.Checkbutton(
+            settings_frame,
+            text="Добавлять в поисковый индекс",
+            variable=self.search_index_var
+        ).grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=2)
+        
+        ttk.Checkbutton(
+            settings_frame,
+            text="Сжатый архив канала вместо файлов",
+            variable=self.pack_output_var
+        ).grid(row=4, column=2, columnspan=2, sticky=tk.W, pady=2, padx=(20, 0))
+        
+        ttk.Checkbutton(
+            settings_frame,
+            text="Брать информацию о видео из кеша",
+            variable=self.use_cache_var
+        ).grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=2)
+        
+        # Время жизни кеша информации о видео
+        ttk.Label(settings_frame, text="Кеш, часов (0 - без кеша):").grid(row=5, column=2, sticky=tk.W, pady=2, padx=(20, 0))
+        cache_hours_entry = ttk.Entry(settings_frame, textvariable=self.cache_hours_var, width=10)
+        cache_hours_entry.grid(row=5, column=3, sticky=tk.W, pady=2, padx=(10, 0))
+        
+        ttk.Checkbutton(
+            settings_frame,
+            text="Продолжить незавершенные задания",
+            variable=self.resume_var
+        ).grid(row=6, column=0, columnspan=2, sticky=tk.W, pady=2)
+        
         info_label = ttk.Label(
             settings_frame, 
-            text="Программа автоматически найдет:\n• Оригинальные субтитры\n• Автоматически сгенерированные субтитры\n• Переведенные субтитры",
+            text="Программа автоматически найдет:\n• Оригинальные субтитры\n• Автоматически сгенерированные субтитры\n• Переведенные субтитры\nНесколько языков - через запятую: ru, en, de\nНесколько ссылок - через пробел (во время загрузки их можно добавлять в очередь)",
             font=('TkDefaultFont', 8),
             foreground='gray'
         )
-        info_label.grid(row=2, column=0, columnspan=4, sticky=tk.W, pady=5)
+        info_label.grid(row=7, column=0, columnspan=4, sticky=tk.W, pady=5)
         
         # Кнопки управления
         buttons_frame = ttk.Frame(main_frame)
@@ -140,6 +234,12 @@ class YouTubeSubtitlesDownloader:
         clear_btn = ttk.Button(buttons_frame, text="Очистить лог", command=self.clear_log)
         clear_btn.pack(side=tk.LEFT, padx=5)
         
+        ttk.Checkbutton(
+            buttons_frame,
+            text="Сохранять лог в файл",
+            variable=self.log_to_file_var
+        ).pack(side=tk.LEFT, padx=5)
+        
         # Прогресс бар
         self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
         self.progress.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
@@ -160,10 +260,50 @@ class YouTubeSubtitlesDownloader:
             self.download_path.set(folder)
     
     def log_message(self, message):
+        """Добавление сообщения в лог; можно вызывать из любого потока"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        self.log_queue.put(f"[{timestamp}] {message}\n")
+        
+        file_logger = self.file_logger
+        if file_logger is not None:
+            file_logger.info(message)
+    
+    def call_in_ui(self, func, *args):
+        """Выполнение функции в главном потоке Tk"""
+        self.ui_queue.put((func, args))
+    
+    def process_queues(self):
+        """Периодический перенос накопленных сообщений в окно лога одной вставкой"""
+        try:
+            while True:
+                func, args = self.ui_queue.get_nowait()
+                func(*args)
+        except queue.Empty:
+            pass
+        
+        if self.pending_progress is not None:
+            progress, self.pending_progress = self.pending_progress, None
+            self.update_progress(*progress)
+        
+        lines = []
+        try:
+            while len(lines) < LOG_BATCH_SIZE:
+                lines.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        
+        if lines:
+            self.log_text.insert(tk.END, ''.join(lines))
+            
+            # Ограничиваем размер лога последними строками
+            line_count = int(self.log_text.index('end-1c').split('.')[0])
+            if line_count > LOG_MAX_LINES:
+                self.log_text.delete('1.0', f'{line_count - LOG_MAX_LINES + 1}.0')
+            self.log_text.see(tk.END)
+        
+        # Если сообщений больше, чем помещается в один проход, продолжаем без паузы
+        delay = 1 if len(lines) >= LOG_BATCH_SIZE else LOG_POLL_INTERVAL_MS
+        self.root.after(delay, self.process_queues)
     
     def clear_log(self):
         self.log_text.delete(1.0, tk.END)
@@ -174,9 +314,9 @@ class YouTubeSubtitlesDownloader:
             # Получаем содержимое буфера обмена
             clipboard_content = self.root.clipboard_get()
             
-            # Очищаем поле и вставляем новое содержимое
+            # Очищаем поле и вставляем новое содержимое (список ссылок - через пробел)
             self.url_entry.delete(0, tk.END)
-            self.url_entry.insert(0, clipboard_content.strip())
+            self.url_entry.insert(0, ' '.join(split_urls(clipboard_content)))
             
             # Логируем успешную вставку
             if clipboard_content.strip():
@@ -206,364 +346,134 @@ class YouTubeSubtitlesDownloader:
         finally:
             context_menu.grab_release()
     
-    def validate_url(self, url):
-        """Проверка и определение типа URL"""
-        youtube_patterns = [
-            r'youtube\.com/watch\?v=',
-            r'youtube\.com/channel/',
-            r'youtube\.com/c/',
-            r'youtube\.com/@',
-            r'youtu\.be/',
-            r'youtube\.com/user/'
-        ]
-        
-        for pattern in youtube_patterns:
-            if re.search(pattern, url):
-                return True
-        return False
-    
-    def get_video_info(self, url):
-        """Получение информации о видео/канале"""
+    def get_max_workers(self):
+        """Количество видео, которые обрабатываются одновременно"""
         try:
-            max_videos = int(self.max_videos_var.get())
+            return max(1, int(self.max_workers_var.get()))
         except ValueError:
-            max_videos = 50
-            
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': True,  # Быстрое извлечение только базовой информации
-            'playlistend': max_videos,  # Ограничиваем количество видео
-        }
-        
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return info
-        except Exception as e:
-            raise Exception(f"Ошибка получения информации: {str(e)}")
+            return 4
     
-    def get_language_code(self):
-        """Извлекает код языка из выбранного значения"""
-        lang_value = self.language_var.get()
-        if ' - ' in lang_value:
-            return lang_value.split(' - ')[0]
-        return lang_value
-    
-    def download_subtitles_for_video(self, video_url, video_title, output_dir):
-        """Загрузка субтитров для одного видео"""
-        safe_title = re.sub(r'[<>:"/\\|?*]', '_', video_title)
-        lang_code = self.get_language_code()
-        
-        # Если URL содержит только ID, формируем полный URL
-        if not video_url.startswith('http'):
-            video_url = f"https://www.youtube.com/watch?v={video_url}"
-        
-        # Настройки для yt-dlp
-        ydl_opts = {
-            'writesubtitles': True,
-            'writeautomaticsub': True,  # Всегда включаем автоматические субтитры
-            'subtitleslangs': [lang_code],
-            'subtitlesformat': 'vtt',
-            'skip_download': True,
-            'outtmpl': os.path.join(output_dir, f'{safe_title}.%(ext)s'),
-            'quiet': True,
-            'no_warnings': True,
-        }
-        
+    def get_max_videos(self):
+        """Ограничение количества видео с канала"""
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-                
-            # Поиск файлов субтитров (пробуем разные варианты)
-            lang = lang_code
-            possible_files = [
-                f'{safe_title}.{lang}.vtt',  # Обычные субтитры
-                f'{safe_title}.{lang}-{lang}.vtt',  # Автоматически переведенные
-                f'{safe_title}.{lang}.auto.vtt',  # Автоматические субтитры
-                f'{safe_title}.auto.{lang}.vtt',  # Другой формат автоматических
-            ]
-            
-            # Если язык не английский, пробуем также английские субтитры с переводом
-            if lang != 'en':
-                possible_files.extend([
-                    f'{safe_title}.en-{lang}.vtt',  # Английские переведенные на нужный язык
-                    f'{safe_title}.en.auto-{lang}.vtt',  # Автоматические английские переведенные
-                ])
-            
-            # Если ничего не найдено, пробуем английские автоматические
-            possible_files.extend([
-                f'{safe_title}.en.vtt',
-                f'{safe_title}.en.auto.vtt',
-                f'{safe_title}.auto.en.vtt',
-            ])
-            
-            found_file = None
-            subtitle_type = ""
-            
-            for vtt_file in possible_files:
-                full_path = os.path.join(output_dir, vtt_file)
-                if os.path.exists(full_path):
-                    found_file = full_path
-                    if 'auto' in vtt_file:
-                        subtitle_type = " (автоматические)"
-                    elif '-' in vtt_file and lang in vtt_file:
-                        subtitle_type = " (переведенные)"
-                    break
-            
-            if found_file:
-                # Определяем формат файла в зависимости от выбора пользователя
-                if self.subtitle_format_var.get() == "with_timings":
-                    txt_file = os.path.join(output_dir, f'{safe_title}.{lang}.with_timings.txt')
-                else:
-                    txt_file = os.path.join(output_dir, f'{safe_title}.{lang}.txt')
-                    
-                self.convert_vtt_to_txt(found_file, txt_file)
-                os.remove(found_file)  # Удаляем VTT файл
-                self.log_message(f"✓ Субтитры сохранены{subtitle_type}: {video_title}")
-                return True
-            else:
-                # Попробуем найти любые VTT файлы для этого видео
-                import glob
-                pattern = os.path.join(output_dir, f'{safe_title}*.vtt')
-                vtt_files = glob.glob(pattern)
-                
-                if vtt_files:
-                    # Берем первый найденный файл
-                    found_file = vtt_files[0]
-                    
-                    # Определяем формат файла в зависимости от выбора пользователя
-                    if self.subtitle_format_var.get() == "with_timings":
-                        txt_file = os.path.join(output_dir, f'{safe_title}.{lang}.with_timings.txt')
-                    else:
-                        txt_file = os.path.join(output_dir, f'{safe_title}.{lang}.txt')
-                        
-                    self.convert_vtt_to_txt(found_file, txt_file)
-                    os.remove(found_file)
-                    self.log_message(f"✓ Субтитры сохранены (найден альтернативный язык): {video_title}")
-                    return True
-                else:
-                    self.log_message(f"✗ Субтитры не найдены для: {video_title}")
-                    return False
-                
-        except Exception as e:
-            self.log_message(f"Ошибка загрузки субтитров для '{video_title}': {str(e)}")
-            return False
+            return int(self.max_videos_var.get())
+        except ValueError:
+            return 50
     
-    def convert_vtt_to_txt(self, vtt_file, txt_file):
-        """Конвертация VTT в простой текстовый формат с таймингами или без"""
+    def get_cache_ttl(self):
+        """Время жизни кеша информации о видео в секундах"""
         try:
-            with open(vtt_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Разбиваем на блоки субтитров
-            blocks = re.split(r'\n\s*\n', content)
-            text_lines = []
-            seen_lines = set()  # Для избежания дублирования
-            
-            for block in blocks:
-                lines = block.strip().split('\n')
-                
-                # Пропускаем заголовки и пустые блоки
-                if not lines or lines[0].startswith('WEBVTT') or lines[0].startswith('NOTE'):
-                    continue
-                
-                time_line = None
-                subtitle_lines = []
-                
-                # Ищем строки с текстом и временные метки
-                for line in lines:
-                    line = line.strip()
-                    
-                    # Находим временную метку
-                    if '-->' in line:
-                        time_line = line
-                        continue
-                    
-                    # Пропускаем номера и пустые строки
-                    if re.match(r'^\d+$', line) or not line:
-                        continue
-                    
-                    # Удаляем HTML теги и форматирование
-                    clean_line = re.sub(r'<[^>]+>', '', line)
-                    clean_line = re.sub(r'&[a-zA-Z]+;', '', clean_line)  # HTML entities
-                    clean_line = clean_line.strip()
-                    
-                    if clean_line and clean_line not in seen_lines:
-                        subtitle_lines.append(clean_line)
-                        seen_lines.add(clean_line)
-                
-                # Обрабатываем блок в зависимости от выбранного формата
-                if self.subtitle_format_var.get() == "with_timings" and time_line and subtitle_lines:
-                    # Извлекаем начальное время
-                    start_time = time_line.split('-->')[0].strip()
-                    # Убираем миллисекунды для лучшей читаемости
-                    start_time = re.sub(r'\.\d+', '', start_time)
-                    
-                    # Добавляем временную метку и текст
-                    text_lines.append(f"[{start_time}] {' '.join(subtitle_lines)}")
-                elif subtitle_lines:
-                    # Без таймингов - просто добавляем текст
-                    text_lines.append(' '.join(subtitle_lines))
-            
-            # Сохраняем в TXT файл
-            with open(txt_file, 'w', encoding='utf-8') as f:
-                if self.subtitle_format_var.get() == "with_timings":
-                    # С таймингами - каждая строка с временной меткой
-                    f.write('\n'.join(text_lines))
-                else:
-                    # Без таймингов - объединяем в абзацы
-                    paragraphs = []
-                    current_paragraph = []
-                    
-                    for line in text_lines:
-                        current_paragraph.append(line)
-                        
-                        # Создаем абзац каждые 2-3 строки или при окончании предложения
-                        if (len(current_paragraph) >= 2 and 
-                            (line.endswith('.') or line.endswith('!') or line.endswith('?') or len(current_paragraph) >= 3)):
-                            paragraphs.append(' '.join(current_paragraph))
-                            current_paragraph = []
-                    
-                    # Добавляем оставшиеся строки
-                    if current_paragraph:
-                        paragraphs.append(' '.join(current_paragraph))
-                    
-                    f.write('\n\n'.join(paragraphs))
-                
-        except Exception as e:
-            self.log_message(f"Ошибка конвертации VTT в TXT: {str(e)}")
+            return max(0.0, float(self.cache_hours_var.get().replace(',', '.'))) * 3600
+        except ValueError:
+            return DEFAULT_CACHE_TTL
+    
+    def report_progress(self, done, total):
+        """Прогресс из рабочих потоков: в интерфейс попадает только последнее значение"""
+        self.pending_progress = (done, total)
     
-    def download_worker(self):
+    def update_progress(self, done, total):
+        """Прогресс бар показывает количество обработанных видео канала"""
+        if self.progress['mode'] != 'determinate':
+            self.progress.stop()
+            self.progress.config(mode='determinate', value=0)
+        self.progress.config(maximum=max(total, 1), value=done)
+    
+    def download_worker(self, urls, resume):
         """Основной поток загрузки"""
+        downloader = self.downloader
         try:
-            url = self.url_var.get().strip()
-            if not url:
-                messagebox.showerror("Ошибка", "Введите URL видео или канала")
-                return
-            
-            if not self.validate_url(url):
-                messagebox.showerror("Ошибка", "Неверный URL YouTube")
-                return
-            
-            # Создаем папку для сохранения
-            output_dir = self.download_path.get()
-            os.makedirs(output_dir, exist_ok=True)
-            
-            self.log_message("Получение информации о видео/канале...")
-            info = self.get_video_info(url)
+            # Ссылки проходят через очередь заданий: новые ссылки можно добавлять, не дожидаясь
+            # окончания загрузки, а незавершенные прошлые задания продолжаются, если это выбрано
+            downloader.run_batch(urls, resume=resume)
             
-            # Логируем выбранный формат
-            format_text = "с таймингами" if self.subtitle_format_var.get() == "with_timings" else "без таймингов"
-            self.log_message(f"Формат субтитров: {format_text}")
-            
-            if 'entries' in info:
-                # Это плейлист или канал
-                videos = info['entries']
-                total_videos = len(videos)
-                
-                # Получаем название канала
-                channel_name = info.get('title', info.get('uploader', 'Unknown_Channel'))
-                if not channel_name or channel_name == 'Unknown_Channel':
-                    # Пробуем получить название из первого видео
-                    if videos and videos[0]:
-                        channel_name = videos[0].get('uploader', videos[0].get('channel', 'Unknown_Channel'))
-                
-                # Очищаем название канала от недопустимых символов
-                safe_channel_name = re.sub(r'[<>:"/\\|?*]', '_', channel_name)
-                
-                # Создаем папку для канала
-                channel_output_dir = os.path.join(output_dir, safe_channel_name)
-                os.makedirs(channel_output_dir, exist_ok=True)
-                
-                self.log_message(f"Канал: {channel_name}")
-                self.log_message(f"Найдено {total_videos} видео на канале")
-                self.log_message(f"Папка для сохранения: {channel_output_dir}")
-                
-                success_count = 0
-                for i, video in enumerate(videos, 1):
-                    if not self.is_downloading:
-                        self.log_message("Загрузка прервана пользователем")
-                        break
-                    
-                    # Проверяем, что у нас есть необходимая информация о видео
-                    if not video:
-                        self.log_message(f"[{i}/{total_videos}] Пропуск: нет данных о видео")
-                        continue
-                        
-                    video_title = video.get('title', f'Video_{i}')
-                    video_url = video.get('webpage_url', video.get('url', ''))
-                    
-                    if not video_url:
-                        self.log_message(f"[{i}/{total_videos}] Пропуск: нет URL для '{video_title}'")
-                        continue
-                    
-                    self.log_message(f"[{i}/{total_videos}] Загрузка субтитров: {video_title}")
-                    
-                    try:
-                        if self.download_subtitles_for_video(video_url, video_title, channel_output_dir):
-                            success_count += 1
-                    except Exception as e:
-                        self.log_message(f"Ошибка для видео '{video_title}': {str(e)}")
-                        continue
-                    
-                self.log_message(f"Завершено! Успешно загружено субтитров: {success_count}/{total_videos}")
-                self.log_message(f"Субтитры сохранены в папке: {channel_output_dir}")
-                
-            else:
-                # Это одно видео
-                video_title = info.get('title', 'Unknown_Video')
-                channel_name = info.get('uploader', info.get('channel', 'Unknown_Channel'))
-                
-                # Очищаем название канала от недопустимых символов
-                safe_channel_name = re.sub(r'[<>:"/\\|?*]', '_', channel_name)
-                
-                # Создаем папку для канала (даже для одного видео)
-                channel_output_dir = os.path.join(output_dir, safe_channel_name)
-                os.makedirs(channel_output_dir, exist_ok=True)
-                
-                self.log_message(f"Видео: {video_title}")
-                self.log_message(f"Канал: {channel_name}")
-                self.log_message(f"Папка для сохранения: {channel_output_dir}")
-                
-                if self.download_subtitles_for_video(url, video_title, channel_output_dir):
-                    self.log_message(f"✓ Субтитры успешно сохранены в папке: {channel_output_dir}")
-                else:
-                    self.log_message("✗ Не удалось загрузить субтитры")
+        except ValueError as e:
+            self.call_in_ui(messagebox.showerror, "Ошибка", str(e))
             
         except Exception as e:
             self.log_message(f"Ошибка: {str(e)}")
-            messagebox.showerror("Ошибка", str(e))
+            self.call_in_ui(messagebox.showerror, "Ошибка", str(e))
         
         finally:
-            self.is_downloading = False
-            self.progress.stop()
-            self.download_btn.config(state=tk.NORMAL)
-            self.stop_btn.config(state=tk.DISABLED)
+            self.call_in_ui(self.finish_download)
+    
+    def finish_download(self):
+        """Возврат интерфейса в исходное состояние после завершения загрузки"""
+        self.downloader = None
+        self.is_downloading = False
+        self.pending_progress = None
+        self.progress.stop()
+        self.progress.config(mode='indeterminate', value=0)
+        self.download_btn.config(state=tk.NORMAL, text="Скачать субтитры")
+        self.stop_btn.config(state=tk.DISABLED)
+        
+        if self.file_logger is not None:
+            close_log_file(self.file_logger)
+            self.file_logger = None
     
     def start_download(self):
+        urls = split_urls(self.url_var.get())
         if self.is_downloading:
+            # Во время загрузки ссылки добавляются в очередь текущего запуска
+            added = self.downloader.add_jobs(urls) if self.downloader is not None and urls else None
+            if added is not None:
+                self.log_message(f"Добавлено в очередь: {added}")
             return
         
+        resume = self.resume_var.get()
+        if not urls and not resume:
+            messagebox.showerror("Ошибка", "Введите URL видео или канала")
+            return
+        
+        options = DownloadOptions(
+            output_dir=self.download_path.get(),
+            language=self.language_var.get(),
+            subtitle_format=self.subtitle_format_var.get(),
+            max_videos=self.get_max_videos(),
+            max_workers=self.get_max_workers(),
+            in_memory=self.in_memory_var.get(),
+            retry_failed=self.retry_failed_var.get(),
+            sync=self.sync_var.get(),
+            channel_archive=self.channel_archive_var.get(),
+            search_index=self.search_index_var.get(),
+            pack_output=self.pack_output_var.get(),
+            cache_ttl=self.get_cache_ttl(),
+            use_cache=self.use_cache_var.get(),
+        )
+        self.downloader = SubtitlesDownloader(options, log=self.log_message, progress=self.report_progress)
+        
+        if self.log_to_file_var.get():
+            try:
+                os.makedirs(options.output_dir, exist_ok=True)
+                self.file_logger = open_log_file(os.path.join(options.output_dir, LOG_FILENAME))
+            except OSError as e:
+                self.log_message(f"Не удалось открыть файл лога: {str(e)}")
+        
         self.is_downloading = True
-        self.download_btn.config(state=tk.DISABLED)
+        self.download_btn.config(text="Добавить в очередь")
         self.stop_btn.config(state=tk.NORMAL)
+        self.progress.config(mode='indeterminate', value=0)
         self.progress.start()
         
         # Запускаем загрузку в отдельном потоке
-        thread = threading.Thread(target=self.download_worker)
+        thread = threading.Thread(target=self.download_worker, args=(urls, resume))
         thread.daemon = True
         thread.start()
     
     def stop_download(self):
-        self.is_downloading = False
-        self.progress.stop()
-        self.download_btn.config(state=tk.NORMAL)
+        if self.downloader is not None:
+            self.downloader.stop()
+        # Новую загрузку можно начать только после завершения текущей (finish_download):
+        # потоки загрузки еще дописывают файлы папки сохранения
+        self.download_btn.config(state=tk.DISABLED, text="Скачать субтитры")
         self.stop_btn.config(state=tk.DISABLED)
-        self.log_message("Загрузка остановлена пользователем")
+        self.log_message("Загрузка остановлена пользователем, завершение текущих видео...")
 
 
 def main():
+    if not is_yt_dlp_available():
+        messagebox.showerror("Ошибка", "Необходимо установить yt-dlp:\npip install yt-dlp")
+        exit(1)
+    
     root = tk.Tk()
     app = YouTubeSubtitlesDownloader(root)
     root.mainloop()
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Загрузка субтитров с YouTube видео или целых каналов без графического интерфейса
+
+Запуск из командной строки: python -m ytsubs --help
+
+Модуль загрузки (engine) импортируется при первом обращении к его именам,
+поэтому командная строка и конвертация не загружают его без необходимости.
+"""
+
+from .vtt import SUBTITLE_FORMATS, convert_vtt_to_txt
+
+_ENGINE_NAMES = (
+    'DownloadOptions',
+    'SubtitlesDownloader',
+    'parse_language_code',
+    'parse_language_codes',
+    'validate_url',
+)
+
+__all__ = [
+    'SUBTITLE_FORMATS',
+    'DownloadOptions',
+    'SubtitlesDownloader',
+    'convert_vtt_to_txt',
+    'parse_language_code',
+    'parse_language_codes',
+    'validate_url',
+]
+
+
+def __getattr__(name):
+    if name in _ENGINE_NAMES:
+        from . import engine
+        return getattr(engine, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
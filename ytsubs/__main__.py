@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""Точка входа для python -m ytsubs"""
+
+import sys
+
+from .cli import main
+
+# Проверка нужна пулу процессов: на Windows и macOS дочерние процессы заново импортируют этот модуль
+if __name__ == '__main__':
+    sys.exit(main())
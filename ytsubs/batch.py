@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетная конвертация готовых VTT файлов
+
+Обходит папку с VTT файлами (например, архив другой программы) и конвертирует
+их в пуле процессов на всех ядрах. Результат по каждому файлу запоминается в
+файле состояния в корне папки (отдельно для каждого формата), поэтому при
+повторном запуске конвертируются только новые и измененные файлы.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .files import write_json
+from .vtt import DEFAULT_DEDUP_WINDOW, convert_vtt_to_txt, get_txt_path
+
+
+RECONVERT_STATE_FILENAME = '.subtitles_reconvert.json'
+
+# mtime - файл не изменился, если совпадают время изменения и размер;
+# hash - при другом времени изменения (копия архива) сравнивается содержимое
+CHECK_MODES = ('mtime', 'hash')
+
+STATE_SAVE_EVERY = 1000  # Состояние сохраняется по ходу работы, чтобы прерванный запуск не начинался с нуля
+PROGRESS_INTERVAL = 1.0
+
+
+def iter_vtt_files(root):
+    """VTT файлы в папке и всех вложенных папках"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith('.vtt'):
+                yield os.path.join(dirpath, filename)
+
+
+def file_hash(path):
+    """Хеш содержимого файла"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _convert_task(task):
+    """Конвертация одного файла в процессе пула
+
+    Хеш считается всегда, чтобы он был в состоянии и для проверки --check hash
+    после копирования папки. convert=False - только посчитать хеш.
+    Возвращает (VTT файл, хеш или None, конвертирован ли, ошибка или None).
+    """
+    vtt_file, txt_file, subtitle_format, dedup_window, known_hash, convert = task
+    try:
+        digest = file_hash(vtt_file)
+        if not convert or digest == known_hash:
+            return vtt_file, digest, False, None
+
+        convert_vtt_to_txt(vtt_file, txt_file, subtitle_format, dedup_window)
+        return vtt_file, digest, True, None
+    except Exception as e:
+        return vtt_file, None, False, str(e)
+
+
+class BatchConverter:
+    """Конвертация всех VTT файлов папки с пропуском неизмененных
+
+    Сообщения передаются в функцию log, прогресс - в progress(done, total).
+    """
+
+    def __init__(self, root, subtitle_format="with_timings", dedup_window=DEFAULT_DEDUP_WINDOW,
+                 max_workers=None, check='mtime', force=False, log=None, progress=None):
+        if check not in CHECK_MODES:
+            raise ValueError(f"Неизвестный способ проверки изменений: {check}")
+
+        self.root = root
+        self.subtitle_format = subtitle_format
+        self.dedup_window = dedup_window
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.check = check
+        self.force = force
+        self.log = log or (lambda message: None)
+        self.progress = progress
+        self.state_path = os.path.join(root, RECONVERT_STATE_FILENAME)
+        self._stop_event = threading.Event()
+
+    @property
+    def is_stopped(self):
+        return self._stop_event.is_set()
+
+    def stop(self):
+        """Остановка: новые файлы больше не начинаются"""
+        self._stop_event.set()
+
+    @property
+    def settings(self):
+        """Настройки, для которых состояние ведется отдельно"""
+        return f"{self.subtitle_format}:{self.dedup_window:g}"
+
+    def load_state(self):
+        """Состояние всех форматов: {настройки: {путь VTT: mtime, размер, хеш}}"""
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def save_state(self, data):
+        """Атомарная запись состояния (временный файл + переименование)"""
+        write_json(self.state_path, data)
+
+    def plan(self, state):
+        """Задания для пула и число файлов без изменений
+
+        Возвращает ({VTT файл: (ключ в состоянии, stat)}, [задания], пропущено).
+        """
+        check_hash = self.check == 'hash'
+        pending = {}
+        tasks = []
+        skipped = 0
+
+        for vtt_file in iter_vtt_files(self.root):
+            key = os.path.relpath(vtt_file, self.root).replace(os.sep, '/')
+            stat = os.stat(vtt_file)
+            txt_file = get_txt_path(vtt_file, self.subtitle_format)
+            entry = state.get(key)
+
+            known_hash = None
+            convert = True
+            if not self.force and entry and os.path.exists(txt_file):
+                if entry.get('mtime_ns') == stat.st_mtime_ns and entry.get('size') == stat.st_size:
+                    # Файлам из состояния без хеша (старые запуски) хеш досчитывается без конвертации
+                    if entry.get('hash') or not check_hash:
+                        skipped += 1
+                        continue
+                    convert = False
+                elif entry.get('size') == stat.st_size and check_hash:
+                    known_hash = entry.get('hash')
+
+            pending[vtt_file] = (key, stat)
+            tasks.append((vtt_file, txt_file, self.subtitle_format, self.dedup_window, known_hash, convert))
+
+        return pending, tasks, skipped
+
+    def run(self):
+        """Конвертация папки; возвращает счетчики converted, unchanged, failed, total и время"""
+        if not os.path.isdir(self.root):
+            raise ValueError(f"Папка не найдена: {self.root}")
+
+        self._stop_event.clear()
+        start = time.perf_counter()
+        state_data = self.load_state()
+        state = state_data.setdefault(self.settings, {})
+
+        self.log(f"Поиск VTT файлов: {self.root}")
+        pending, tasks, unchanged = self.plan(state)
+        total = len(tasks) + unchanged
+        self.log(f"Найдено файлов: {total}, без изменений: {unchanged}, к конвертации: {len(tasks)}")
+        self.log(f"Процессов: {self.max_workers}")
+
+        counts = {'converted': 0, 'unchanged': unchanged, 'failed': 0}
+        last_report = time.perf_counter()
+
+        if tasks:
+            # Крупные порции уменьшают накладные расходы на передачу заданий между процессами
+            chunksize = max(1, min(64, len(tasks) // (self.max_workers * 4)))
+            executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            results = executor.map(_convert_task, tasks, chunksize=chunksize)
+            try:
+                for done, (vtt_file, digest, converted, error) in enumerate(results, 1):
+                    key, stat = pending[vtt_file]
+                    if error is not None:
+                        counts['failed'] += 1
+                        state.pop(key, None)
+                        self.log(f"Ошибка конвертации {key}: {error}")
+                    else:
+                        counts['converted' if converted else 'unchanged'] += 1
+                        state[key] = {
+                            'mtime_ns': stat.st_mtime_ns,
+                            'size': stat.st_size,
+                            'hash': digest or (state.get(key) or {}).get('hash'),
+                        }
+
+                    if done % STATE_SAVE_EVERY == 0:
+                        self.save_state(state_data)
+                    if self.progress is not None:
+                        self.progress(unchanged + done, total)
+
+                    now = time.perf_counter()
+                    if now - last_report >= PROGRESS_INTERVAL:
+                        last_report = now
+                        self.log(f"Обработано: {unchanged + done}/{total} ({done / (now - start):.0f} файлов/с)")
+
+                    if self.is_stopped:
+                        self.log("Конвертация прервана пользователем")
+                        break
+            finally:
+                results.close()  # Отменяет еще не начатые задания
+                executor.shutdown(wait=True)
+                self.save_state(state_data)
+
+        elapsed = time.perf_counter() - start
+        processed = counts['converted'] + counts['unchanged'] + counts['failed']
+        self.log(
+            f"Готово за {elapsed:.1f} с ({processed / elapsed if elapsed else 0:.0f} файлов/с): "
+            f"конвертировано {counts['converted']}, без изменений {counts['unchanged']}, ошибок {counts['failed']}"
+        )
+        return dict(counts, total=total, elapsed=elapsed)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Кеш информации о видео и списков видео каналов
+
+Повторный запуск (другой формат, другое число видео, повтор неудачных) берет
+названия, списки каналов и доступные дорожки субтитров из кеша, без запросов к
+YouTube. Записи хранятся в SQLite в папке сохранения, сжатыми; устаревают по
+времени жизни, а при превышении размера удаляются давно не использованные.
+"""
+
+import json
+import threading
+import time
+import zlib
+from urllib.parse import parse_qs, urlparse
+
+
+CACHE_FILENAME = '.subtitles_cache.sqlite'
+DEFAULT_CACHE_TTL = 24 * 3600  # Секунды
+DEFAULT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Списки каналов устаревают быстро (новые видео), поэтому хранятся недолго
+LISTING_CACHE_TTL = 30 * 60
+
+# Ссылки на дорожки субтитров подписаны и имеют срок действия (параметр expire):
+# запись устаревает немного раньше, чтобы не получить из кеша уже недействительную ссылку
+URL_EXPIRY_MARGIN = 10 * 60
+
+# Из информации о видео сохраняется только нужное для выбора и загрузки субтитров
+VIDEO_INFO_KEYS = (
+    'id', 'title', 'fulltitle', 'uploader', 'uploader_id', 'channel', 'channel_id', 'channel_url',
+    'webpage_url', 'original_url', 'webpage_url_basename', 'webpage_url_domain', 'extractor', 'extractor_key',
+    'upload_date', 'timestamp', 'duration', 'live_status', 'language', 'http_headers',
+    'subtitles', 'automatic_captions',
+)
+PLAYLIST_INFO_KEYS = ('id', 'title', 'uploader', 'channel', 'webpage_url', 'extractor', 'extractor_key')
+PLAYLIST_ENTRY_KEYS = ('_type', 'ie_key', 'id', 'url', 'title', 'uploader', 'channel', 'upload_date', 'duration')
+
+
+def trim_info(info, keys):
+    return {key: info[key] for key in keys if key in info}
+
+
+def url_expiry(info):
+    """Самый ранний срок действия ссылок на дорожки субтитров (unix time) или None"""
+    expiry = None
+    for tracks in (info.get('subtitles') or {}, info.get('automatic_captions') or {}):
+        for formats in tracks.values():
+            for track_format in formats or []:
+                values = parse_qs(urlparse(track_format.get('url') or '').query).get('expire')
+                if values and values[0].isdigit():
+                    expire = int(values[0])
+                    expiry = expire if expiry is None else min(expiry, expire)
+    return expiry
+
+
+class MetadataCache:
+    """Кеш JSON-значений по ключу с временем жизни и ограничением общего размера (LRU)
+
+    Методы можно вызывать из рабочих потоков загрузки.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_CACHE_TTL, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        # sqlite3 загружается только при открытии кеша: константы модуля нужны и без него
+        import sqlite3
+
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, '
+                'expires REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            self._db.execute('DELETE FROM entries WHERE expires <= ?', (time.time(),))
+        self._total_size = self._db.execute('SELECT coalesce(sum(size), 0) FROM entries').fetchone()[0]
+
+    def get(self, key):
+        """Значение из кеша или None, если его нет или оно устарело"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute('SELECT value, expires FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            with self._db:
+                self._db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, value, expires=None):
+        """Сохранение значения; expires - срок действия (unix time), не позже времени жизни кеша"""
+        now = time.time()
+        expires = min(now + self.ttl, expires) if expires else now + self.ttl
+        if expires <= now:
+            return
+
+        data = zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        with self._lock, self._db:
+            old = self._db.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)',
+                (key, data, len(data), expires, now),
+            )
+            self._total_size += len(data) - (old[0] if old else 0)
+            if self._total_size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Сначала давно не использованные записи, пока не останется 90% допустимого размера
+        target = self.max_bytes * 0.9
+        for key, size in self._db.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall():
+            if self._total_size <= target:
+                break
+            self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self._total_size -= size
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ListingRecorder:
+    """Запоминание видео из списка канала по мере обхода"""
+
+    def __init__(self):
+        self.entries = []
+        self.complete = False
+
+    def wrap(self, entries):
+        for entry in entries:
+            self.entries.append(trim_info(entry, PLAYLIST_ENTRY_KEYS) if entry else None)
+            yield entry
+        self.complete = True
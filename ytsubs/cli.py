@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Интерфейс командной строки
+
+Тяжелые модули (yt-dlp) загружаются только внутри команд, поэтому --help
+и конвертация готовых файлов запускаются мгновенно.
+"""
+
+import argparse
+import io
+import os
+import sys
+from datetime import datetime
+
+from .throttle import DEFAULT_REQUEST_RATE
+from .vtt import DEFAULT_DEDUP_WINDOW, SUBTITLE_FORMATS
+
+
+file_logger = None  # Дублирование лога в файл (--log-file)
+
+
+def log_message(message):
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    # Одна запись на сообщение, чтобы строки из разных потоков не перемешивались
+    sys.stdout.write(f"[{timestamp}] {message}\n")
+    sys.stdout.flush()
+    if file_logger is not None:
+        file_logger.info(message)
+
+
+def cmd_download(args):
+    """Загрузка субтитров с видео или канала (или по списку ссылок)"""
+    from .engine import DownloadOptions, SubtitlesDownloader
+    from .jobs import read_url_list
+
+    if not args.url and not args.input and not args.resume:
+        log_message("Укажите URL, файл со списком ссылок (-i) или --resume")
+        return 2
+
+    options = DownloadOptions(
+        output_dir=args.output,
+        language=args.language,
+        subtitle_format=args.format,
+        max_videos=args.max_videos,
+        max_workers=args.workers,
+        in_memory=args.in_memory,
+        retry_failed=args.retry_failed,
+        sync=args.sync,
+        dedup_window=args.dedup_window,
+        channel_archive=args.channel_archive,
+        search_index=args.index,
+        cache_ttl=args.cache_ttl * 3600,
+        cache_max_bytes=args.cache_size * 1024 * 1024,
+        use_cache=not args.no_cache,
+        request_rate=args.rate,
+        report_file=args.report,
+        profile=args.profile,
+        pack_output=args.pack,
+    )
+    downloader = SubtitlesDownloader(options, log=log_message)
+    try:
+        # Несколько ссылок, список из файла или продолжение очереди - пакетная загрузка
+        if len(args.url) == 1 and not args.input and not args.resume:
+            downloader.run(args.url[0])
+        else:
+            urls = list(args.url)
+            if args.input:
+                urls.extend(read_url_list(args.input))
+            downloader.run_batch(urls, resume=args.resume)
+    except KeyboardInterrupt:
+        downloader.stop()
+        log_message("Загрузка остановлена пользователем")
+        return 130
+    return 0
+
+
+def cmd_convert(args):
+    """Конвертация готового VTT файла в текст"""
+    from .vtt import convert_vtt_to_txt, get_txt_path
+
+    txt_file = args.output or get_txt_path(args.vtt_file, args.format)
+
+    convert_vtt_to_txt(args.vtt_file, txt_file, args.format, args.dedup_window)
+    log_message(f"✓ Субтитры сохранены: {txt_file}")
+    return 0
+
+
+def add_dedup_argument(parser):
+    parser.add_argument('--dedup-window', type=float, default=DEFAULT_DEDUP_WINDOW, metavar='СЕКУНДЫ',
+                        help="убирать повторы строк в пределах этого окна, 0 - не убирать (по умолчанию: %(default)s)")
+
+
+def cmd_reconvert(args):
+    """Пакетная конвертация всех VTT файлов папки"""
+    from .batch import BatchConverter
+
+    converter = BatchConverter(
+        args.directory,
+        subtitle_format=args.format,
+        dedup_window=args.dedup_window,
+        max_workers=args.workers,
+        check=args.check,
+        force=args.force,
+        log=log_message,
+    )
+    try:
+        counts = converter.run()
+    except KeyboardInterrupt:
+        log_message("Конвертация остановлена пользователем")
+        return 130
+    return 1 if counts['failed'] else 0
+
+
+def cmd_search(args):
+    """Поиск по индексу загруженных субтитров"""
+    from .search import INDEX_FILENAME, SearchIndex
+    from .vtt import format_clock
+
+    index_path = os.path.join(args.directory, INDEX_FILENAME)
+    if not os.path.exists(index_path):
+        raise ValueError(f"Индекс не найден: {index_path} (загрузите субтитры с --index или выполните index)")
+
+    with SearchIndex(index_path) as index:
+        hits = index.search(args.query, limit=args.limit, channel=args.channel, lang=args.language, raw=args.raw)
+
+    for hit in hits:
+        sys.stdout.write(f"[{format_clock(hit.start_ms or 0)}] {hit.channel} - {hit.title} ({hit.lang})\n"
+                         f"    {hit.snippet}\n    {hit.url}\n")
+    if not hits:
+        sys.stdout.write("Ничего не найдено\n")
+    return 0
+
+
+def cmd_index(args):
+    """Добавление сводных файлов каналов в поисковый индекс"""
+    from .search import INDEX_FILENAME, SearchIndex, index_archives
+
+    with SearchIndex(os.path.join(args.directory, INDEX_FILENAME)) as index:
+        count = index_archives(index, args.directory, log=log_message)
+        videos, cues = index.stats()
+    log_message(f"Добавлено видео: {count}. Всего в индексе: видео {videos}, фраз {cues}")
+    return 0
+
+
+def cmd_clip(args):
+    """Фрагмент субтитров по времени из VTT файла или сводного файла канала"""
+    from .columnar import ARCHIVE_FILENAME, CueArchive
+    from .cues import CueTable, parse_clock
+    from .vtt import write_cues
+
+    start_ms = parse_clock(args.start) if args.start else None
+    end_ms = parse_clock(args.end) if args.end else None
+
+    source = args.source
+    if os.path.isdir(source):
+        source = os.path.join(source, ARCHIVE_FILENAME)
+    if source.lower().endswith('.vtt'):
+        with open(source, 'r', encoding='utf-8') as f:
+            table = CueTable.from_vtt(f, args.dedup_window)
+    else:
+        if not args.video:
+            raise ValueError("Для сводного файла канала укажите ID видео (--video)")
+        with CueArchive(source) as archive:
+            if archive.find_video(args.video, args.language) is None:
+                raise ValueError(f"В сводном файле нет видео: {args.video}")
+            table = archive.table(args.video, args.language)
+
+    output = io.StringIO()
+    write_cues(table.iter_cues(start_ms, end_ms), output, args.format)
+    text = output.getvalue()
+    sys.stdout.write(text if not text or text.endswith('\n') else text + '\n')
+    return 0
+
+
+def cmd_show(args):
+    """Вывод текста одного видео из сжатого архива канала"""
+    from .transcripts import TranscriptArchive
+
+    archive = TranscriptArchive(args.directory)
+    names = archive.find(args.video, args.language) if args.video not in archive else [args.video]
+    if not names:
+        raise ValueError(f"В архиве нет субтитров: {args.video}")
+
+    for name in names:
+        sys.stdout.write(archive.read(name))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m ytsubs',
+        description="Загрузка субтитров с YouTube видео или целых каналов",
+    )
+    subparsers = parser.add_subparsers(dest='command', metavar='КОМАНДА')
+    subparsers.required = True
+
+    download = subparsers.add_parser('download', help="скачать субтитры с видео или канала")
+    download.add_argument('url', nargs='*', help="URL видео, канала или плейлиста (можно несколько)")
+    download.add_argument('-i', '--input', metavar='ФАЙЛ',
+                          help="файл со списком ссылок, по одной на строку ('-' - стандартный ввод)")
+    download.add_argument('--resume', action='store_true',
+                          help="продолжить незавершенные задания пакетной загрузки в папке сохранения")
+    download.add_argument('-o', '--output', default=os.path.expanduser("~/Downloads/Subtitles"),
+                          help="папка для сохранения (по умолчанию: %(default)s)")
+    download.add_argument('-l', '--language', default='ru',
+                          help="код языка субтитров или несколько через запятую: ru,en,de (по умолчанию: %(default)s)")
+    download.add_argument('-f', '--format', choices=SUBTITLE_FORMATS, default='with_timings',
+                          help="формат субтитров (по умолчанию: %(default)s)")
+    download.add_argument('-n', '--max-videos', type=int, default=50,
+                          help="максимум видео с канала (по умолчанию: %(default)s)")
+    download.add_argument('-j', '--workers', type=int, default=4,
+                          help="количество параллельных загрузок (по умолчанию: %(default)s)")
+    download.add_argument('--in-memory', action='store_true',
+                          help="загружать субтитры в память, без временных VTT файлов")
+    download.add_argument('--retry-failed', action='store_true',
+                          help="повторить видео, которые не удалось загрузить в прошлый раз")
+    download.add_argument('--sync', action='store_true',
+                          help="только видео, вышедшие после прошлой синхронизации канала")
+    add_dedup_argument(download)
+    download.add_argument('--channel-archive', action='store_true',
+                          help="дополнительно собрать все субтитры канала в один файл subtitles.cues")
+    download.add_argument('--pack', action='store_true',
+                          help="сохранять субтитры в сжатый архив канала (transcripts-*.jsonl.gz) "
+                               "вместо отдельных файлов")
+    download.add_argument('--index', action='store_true',
+                          help="добавлять субтитры в поисковый индекс папки сохранения (для команды search)")
+    download.add_argument('--rate', type=float, default=DEFAULT_REQUEST_RATE, metavar='ЗАПРОСОВ',
+                          help="не больше стольких запросов к YouTube в секунду, 0 - без ограничения "
+                               "(по умолчанию: %(default)s)")
+    download.add_argument('--cache-ttl', type=float, default=24, metavar='ЧАСЫ',
+                          help="время жизни кеша информации о видео, 0 - без кеша (по умолчанию: %(default)s)")
+    download.add_argument('--cache-size', type=int, default=200, metavar='МБ',
+                          help="максимальный размер кеша (по умолчанию: %(default)s)")
+    download.add_argument('--no-cache', action='store_true',
+                          help="не брать данные из кеша (свежие данные все равно сохраняются в кеш)")
+    download.add_argument('--report', metavar='ФАЙЛ',
+                          help="отчет о запуске в JSON (по умолчанию .subtitles_report.json в папке сохранения)")
+    download.add_argument('--profile', action='store_true',
+                          help="добавить в отчет профиль cProfile и распределение памяти (tracemalloc)")
+    download.add_argument('--log-file', help="дублировать лог в файл (с ротацией по размеру)")
+    download.set_defaults(func=cmd_download)
+
+    convert = subparsers.add_parser('convert', help="конвертировать VTT файл в текст")
+    convert.add_argument('vtt_file', help="исходный VTT файл")
+    convert.add_argument('output', nargs='?', help="итоговый TXT файл (по умолчанию рядом с исходным)")
+    convert.add_argument('-f', '--format', choices=SUBTITLE_FORMATS, default='with_timings',
+                         help="формат субтитров (по умолчанию: %(default)s)")
+    add_dedup_argument(convert)
+    convert.set_defaults(func=cmd_convert)
+
+    reconvert = subparsers.add_parser('reconvert', help="конвертировать все VTT файлы папки (пакетно, на всех ядрах)")
+    reconvert.add_argument('directory', help="папка с VTT файлами (обходится рекурсивно)")
+    reconvert.add_argument('-f', '--format', choices=SUBTITLE_FORMATS, default='with_timings',
+                           help="формат субтитров (по умолчанию: %(default)s)")
+    reconvert.add_argument('-j', '--workers', type=int, default=None,
+                           help="количество процессов (по умолчанию: число ядер)")
+    reconvert.add_argument('--check', choices=('mtime', 'hash'), default='mtime',
+                           help="как определять неизмененные файлы: по времени изменения или по содержимому "
+                                "(по умолчанию: %(default)s)")
+    reconvert.add_argument('--force', action='store_true', help="конвертировать все файлы заново")
+    add_dedup_argument(reconvert)
+    reconvert.set_defaults(func=cmd_reconvert)
+
+    search = subparsers.add_parser('search', help="найти фразу в загруженных субтитрах")
+    search.add_argument('query', help="слова для поиска")
+    search.add_argument('-d', '--directory', default=os.path.expanduser("~/Downloads/Subtitles"),
+                        help="папка сохранения с индексом (по умолчанию: %(default)s)")
+    search.add_argument('-n', '--limit', type=int, default=20, help="количество результатов (по умолчанию: %(default)s)")
+    search.add_argument('--channel', help="только этот канал")
+    search.add_argument('-l', '--language', help="только этот язык")
+    search.add_argument('--raw', action='store_true', help="запрос в синтаксисе FTS5 (OR, NEAR, \"фраза\", префикс*)")
+    search.set_defaults(func=cmd_search)
+
+    index = subparsers.add_parser('index', help="добавить сводные файлы каналов (subtitles.cues) в поисковый индекс")
+    index.add_argument('directory', help="папка сохранения")
+    index.set_defaults(func=cmd_index)
+
+    clip = subparsers.add_parser('clip', help="вывести фрагмент субтитров по времени (из VTT или subtitles.cues)")
+    clip.add_argument('source', help="VTT файл, сводный файл канала subtitles.cues или папка канала с ним")
+    clip.add_argument('-s', '--start', metavar='ВРЕМЯ', help="начало фрагмента: ЧЧ:ММ:СС, ММ:СС или секунды")
+    clip.add_argument('-e', '--end', metavar='ВРЕМЯ', help="конец фрагмента (не включительно)")
+    clip.add_argument('-v', '--video', help="ID видео (для сводного файла канала)")
+    clip.add_argument('-l', '--language', help="язык (для сводного файла канала)")
+    clip.add_argument('-f', '--format', choices=SUBTITLE_FORMATS, default='with_timings',
+                      help="формат вывода (по умолчанию: %(default)s)")
+    add_dedup_argument(clip)
+    clip.set_defaults(func=cmd_clip)
+
+    show = subparsers.add_parser('show', help="вывести субтитры видео из сжатого архива канала (--pack)")
+    show.add_argument('directory', help="папка канала с архивом")
+    show.add_argument('video', help="ID видео или имя файла в архиве")
+    show.add_argument('-l', '--language', help="только этот язык")
+    show.set_defaults(func=cmd_show)
+
+    return parser
+
+
+def main(argv=None):
+    global file_logger
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        if getattr(args, 'log_file', None):
+            from .logs import open_log_file
+            file_logger = open_log_file(args.log_file)
+        return args.func(args)
+    except Exception as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if file_logger is not None:
+            from .logs import close_log_file
+            close_log_file(file_logger)
+            file_logger = None
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Сводный файл субтитров канала в колоночном формате
+
+Все фразы канала хранятся в одном файле вместо тысяч маленьких: столбцы начала
+и конца фраз (int64, миллисекунды, -1 если времени нет), смещения текста
+(uint64) и весь текст UTF-8 одним блоком, плюс таблица видео с диапазонами
+строк. Столбцы выровнены по 8 байт и записаны в порядке little-endian, поэтому
+файл открывается через mmap и читается без разбора (CueArchive).
+
+Структура: MAGIC, длина заголовка (uint64), заголовок JSON, столбцы.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+
+from .cues import NO_TIME, CueTable
+from .files import atomic_write
+from .vtt import Cue
+
+
+ARCHIVE_FILENAME = 'subtitles.cues'
+MAGIC = b'YTSCUES1'
+FORMAT_VERSION = 1
+
+_ALIGNMENT = 8
+
+
+def _padding(size):
+    return -size % _ALIGNMENT
+
+
+def _to_little_endian(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _column_bytes(column):
+    """Байты среза столбца CueArchive в порядке little-endian"""
+    if sys.byteorder == 'big':
+        return _to_little_endian(array(column.format, column)).tobytes()
+    return column.tobytes()
+
+
+class CueArchive:
+    """Чтение сводного файла канала через mmap
+
+    start_ms и end_ms - столбцы (memoryview) по всем фразам файла,
+    videos - список видео с диапазонами строк (row, count).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        try:
+            if self._mmap[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"Не сводный файл субтитров: {path}")
+            header_size, = struct.unpack_from('<Q', self._mmap, len(MAGIC))
+            header_start = len(MAGIC) + 8
+            header = json.loads(bytes(self._mmap[header_start:header_start + header_size]).decode('utf-8'))
+            if header.get('version') != FORMAT_VERSION:
+                raise ValueError(f"Неподдерживаемая версия сводного файла: {header.get('version')}")
+        except BaseException:
+            self.close()
+            raise
+
+        self.videos = header['videos']
+        self.count = header['count']
+        data_start = header_start + header_size + _padding(header_size)
+        columns = {name: data_start + offset for name, offset in header['columns'].items()}
+
+        view = memoryview(self._mmap)
+        self._views = [view]
+        self.start_ms = self._column(view, columns['start_ms'], self.count, 'q')
+        self.end_ms = self._column(view, columns['end_ms'], self.count, 'q')
+        self.text_offsets = self._column(view, columns['text_offsets'], self.count + 1, 'Q')
+        self.text_data = view[columns['text']:columns['text'] + header['text_bytes']]
+        self._views.append(self.text_data)
+
+    def _column(self, view, offset, length, typecode):
+        column = view[offset:offset + length * 8]
+        if sys.byteorder == 'big':
+            # Файл всегда little-endian: на big-endian платформе столбец копируется с разворотом байт
+            values = array(typecode, column.tobytes())
+            values.byteswap()
+            return memoryview(values)
+        column = column.cast(typecode)
+        self._views.append(column)
+        return column
+
+    def __len__(self):
+        return self.count
+
+    def text(self, row):
+        return bytes(self.text_data[self.text_offsets[row]:self.text_offsets[row + 1]]).decode('utf-8')
+
+    def cue(self, row):
+        start_ms, end_ms = self.start_ms[row], self.end_ms[row]
+        return Cue(
+            None if start_ms == NO_TIME else start_ms,
+            None if end_ms == NO_TIME else end_ms,
+            self.text(row).split('\n'),
+        )
+
+    def find_video(self, video_id, lang=None):
+        """Запись видео из таблицы или None"""
+        for video in self.videos:
+            if video['id'] == video_id and (lang is None or video['lang'] == lang):
+                return video
+        return None
+
+    def _rows(self, video_id=None, lang=None):
+        if video_id is None:
+            return range(self.count)
+        video = self.find_video(video_id, lang)
+        return range(video['row'], video['row'] + video['count']) if video else range(0)
+
+    def iter_cues(self, video_id=None, lang=None):
+        """Фразы одного видео или всего файла"""
+        for row in self._rows(video_id, lang):
+            yield self.cue(row)
+
+    def table(self, video_id=None, lang=None):
+        """Фразы одного видео или всего файла в CueTable (столбцы времени копируются целиком)"""
+        rows = self._rows(video_id, lang)
+        return CueTable.from_columns(
+            self.start_ms[rows.start:rows.stop],
+            self.end_ms[rows.start:rows.stop],
+            (self.text(row) for row in rows),
+        )
+
+    def close(self):
+        # Все срезы mmap нужно освободить до его закрытия
+        for view in reversed(getattr(self, '_views', [])):
+            view.release()
+        self._views = []
+        if getattr(self, '_mmap', None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ChannelCueWriter:
+    """Сборка сводного файла канала по мере загрузки видео
+
+    Фразы новых видео копятся во временных файлах столбцов, при закрытии файл
+    канала переписывается целиком: сохраненные ранее видео (кроме загруженных
+    заново) и новые. Запись атомарная: временный файл + переименование.
+    Методы можно вызывать из рабочих потоков.
+    """
+
+    def __init__(self, directory, filename=ARCHIVE_FILENAME):
+        self.path = os.path.join(directory, filename)
+        self._lock = threading.Lock()
+        self._videos = {}  # (видео, язык) -> запись таблицы видео
+        self._rows = 0
+        self._text_bytes = 0
+        self._columns = {
+            name: tempfile.TemporaryFile(dir=directory, prefix='.cues_')
+            for name in ('start_ms', 'end_ms', 'text_lengths', 'text')
+        }
+
+    def add_video(self, video_id, lang, title, cues, channel=None):
+        """Добавление фраз одного видео (повторное добавление заменяет прежние)
+
+        cues - CueTable (столбцы времени записываются как есть) или последовательность Cue.
+        channel - название канала для поискового индекса (см. search.index_archives).
+        """
+        if not isinstance(cues, CueTable):
+            cues = CueTable.from_cues(cues)
+        starts = cues.start_ms
+        ends = cues.end_ms
+        texts = [text.encode('utf-8') for text in cues.texts]
+        lengths = array('Q', map(len, texts))
+
+        with self._lock:
+            self._videos[(video_id, lang)] = {
+                'id': video_id,
+                'lang': lang,
+                'title': title,
+                'channel': channel,
+                'row': self._rows,
+                'count': len(starts),
+                'text_start': self._text_bytes,
+            }
+            for name, values in (('start_ms', starts), ('end_ms', ends), ('text_lengths', lengths)):
+                self._columns[name].write(_to_little_endian(values).tobytes())
+            self._columns['text'].write(b''.join(texts))
+            self._rows += len(starts)
+            self._text_bytes += sum(lengths)
+
+    def _new_segments(self):
+        """Новые видео: (запись, функция чтения столбца, длины текстов фраз)"""
+        def read(video, name, itemsize=8):
+            column = self._columns[name]
+            if name == 'text':
+                column.seek(video['text_start'])
+                return column.read(video['text_size'])
+            column.seek(video['row'] * itemsize)
+            return column.read(video['count'] * itemsize)
+
+        lengths_file = self._columns['text_lengths']
+        for video in self._videos.values():
+            lengths_file.seek(video['row'] * 8)
+            lengths = array('Q', lengths_file.read(video['count'] * 8))
+            if sys.byteorder == 'big':
+                lengths.byteswap()
+            video['text_size'] = sum(lengths)
+            yield video, read, lengths
+
+    def close(self):
+        """Запись сводного файла канала"""
+        with self._lock:
+            try:
+                if self._videos:
+                    for column in self._columns.values():
+                        column.flush()
+                    self._write_archive()
+            finally:
+                for column in self._columns.values():
+                    column.close()
+                self._videos = {}
+
+    def _write_archive(self):
+        # Прежний файл открыт через mmap, поэтому закрывается до замены
+        with atomic_write(self.path, 'wb') as f:
+            old = CueArchive(self.path) if os.path.exists(self.path) else None
+            try:
+                self._write_columns(f, old)
+            finally:
+                if old is not None:
+                    old.close()
+
+    def _write_columns(self, f, old):
+        """Запись сводного файла: видео из прежнего файла old (кроме замененных) и новые"""
+        kept = [video for video in (old.videos if old else []) if (video['id'], video['lang']) not in self._videos]
+        new = list(self._new_segments())
+
+        count = sum(video['count'] for video in kept) + sum(video['count'] for video, _, _ in new)
+        # Таблица видео и смещения текста в итоговом файле
+        videos = []
+        text_offsets = array('Q', [0])
+        row = 0
+        for video in kept:
+            for i in range(video['row'] + 1, video['row'] + video['count'] + 1):
+                text_offsets.append(text_offsets[-1] + old.text_offsets[i] - old.text_offsets[i - 1])
+            videos.append({'id': video['id'], 'lang': video['lang'], 'title': video['title'],
+                           'channel': video.get('channel'), 'row': row, 'count': video['count']})
+            row += video['count']
+        for video, _, lengths in new:
+            for length in lengths:
+                text_offsets.append(text_offsets[-1] + length)
+            videos.append({'id': video['id'], 'lang': video['lang'], 'title': video['title'],
+                           'channel': video['channel'], 'row': row, 'count': video['count']})
+            row += video['count']
+        text_bytes = text_offsets[-1]
+
+        columns = {}
+        offset = 0
+        for name, size in (('start_ms', count * 8), ('end_ms', count * 8),
+                           ('text_offsets', (count + 1) * 8), ('text', text_bytes)):
+            columns[name] = offset
+            offset += size + _padding(size)
+
+        header = json.dumps({
+            'version': FORMAT_VERSION,
+            'count': count,
+            'text_bytes': text_bytes,
+            'columns': columns,
+            'videos': videos,
+        }, ensure_ascii=False).encode('utf-8')
+
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header + b'\0' * _padding(len(header)))
+
+        for name in ('start_ms', 'end_ms'):
+            for video in kept:
+                f.write(_column_bytes(getattr(old, name)[video['row']:video['row'] + video['count']]))
+            for video, read, _ in new:
+                f.write(read(video, name))
+            f.write(b'\0' * _padding(count * 8))
+
+        f.write(_to_little_endian(text_offsets).tobytes())
+        f.write(b'\0' * _padding((count + 1) * 8))
+
+        for video in kept:
+            start = old.text_offsets[video['row']]
+            end = old.text_offsets[video['row'] + video['count']]
+            f.write(old.text_data[start:end])
+        for video, read, _ in new:
+            f.write(read(video, 'text'))
+        f.write(b'\0' * _padding(text_bytes))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Фразы субтитров в компактном виде с выборкой по времени
+
+CueTable хранит начало и конец фраз в целочисленных столбцах (array,
+миллисекунды, NO_TIME если времени нет) и текст каждой фразы одной строкой,
+без отдельного объекта на фразу. Таблица заполняется целиком (из VTT, из
+сводного файла канала) или по одной фразе во время конвертации, а фрагмент по
+времени ("с 12:00 до 15:30") находится двоичным поиском, без повторного разбора.
+
+При переборе таблица отдает обычные Cue, поэтому функции записи форматов из
+vtt.py, сводный файл канала и поисковый индекс работают с ней без изменений.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .vtt import DEFAULT_DEDUP_WINDOW, Cue, iter_cues
+
+
+NO_TIME = -1  # Значение столбцов времени для фраз без временной метки
+
+
+def parse_clock(value):
+    """Время ЧЧ:ММ:СС, ММ:СС или секунды (можно с миллисекундами после точки) в миллисекундах"""
+    text = value.strip().replace(',', '.')
+    clock, _, fraction = text.partition('.')
+    parts = clock.split(':')
+    if len(parts) > 3 or not all(part.isdigit() for part in parts) or (fraction and not fraction.isdigit()):
+        raise ValueError(f"Неверное время: {value}")
+
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds * 1000 + int(fraction[:3].ljust(3, '0') if fraction else 0)
+
+
+def _max_ends(keys, ends):
+    """Столбец наибольшего конца фраз от начала таблицы до каждой строки"""
+    result = array('q')
+    current = 0
+    for key, end in zip(keys, ends):
+        current = max(current, key if end == NO_TIME else end)
+        result.append(current)
+    return result
+
+
+class CueTable:
+    """Фразы субтитров столбцами: start_ms, end_ms (array 'q') и texts (строки фраз через '\\n')
+
+    Фрагмент по времени выбирается двоичным поиском по началу фраз, а фразы,
+    начавшиеся раньше и еще звучащие, - по столбцу наибольшего конца. Фразы без
+    временной метки считаются одновременными с предыдущей (как при удалении
+    повторов). Если начала фраз идут не по возрастанию, фрагмент выбирается
+    перебором.
+    """
+
+    __slots__ = ('start_ms', 'end_ms', 'texts', '_keys', '_max_ends', '_ordered')
+
+    def __init__(self):
+        self.start_ms = array('q')
+        self.end_ms = array('q')
+        self.texts = []
+        self._keys = array('q')  # Начало для поиска: у фраз без времени - начало предыдущей
+        self._max_ends = array('q')  # Наибольший конец фраз до этой строки включительно
+        self._ordered = True
+
+    @classmethod
+    def from_cues(cls, cues):
+        """Таблица из последовательности Cue (например, iter_cues)"""
+        table = cls()
+        table.extend(cues)
+        return table
+
+    @classmethod
+    def from_vtt(cls, lines, dedup_window=DEFAULT_DEDUP_WINDOW):
+        """Таблица из строк VTT (файла или списка) с удалением повторов, как при конвертации"""
+        return cls.from_cues(iter_cues(lines, dedup_window))
+
+    @classmethod
+    def from_columns(cls, start_ms, end_ms, texts):
+        """Таблица из готовых столбцов (например, срезов сводного файла канала)"""
+        table = cls()
+        table.start_ms = array('q', start_ms)
+        table.end_ms = array('q', end_ms)
+        table.texts = list(texts)
+        previous = 0
+        for start in table.start_ms:
+            if start != NO_TIME:
+                table._ordered = table._ordered and start >= previous
+                previous = start
+            table._keys.append(previous)
+        table._max_ends = _max_ends(table._keys, table.end_ms)
+        return table
+
+    def append(self, cue):
+        """Добавление фразы (подходит как on_cue при конвертации)"""
+        start_ms = NO_TIME if cue.start_ms is None else cue.start_ms
+        previous = self._keys[-1] if self._keys else 0
+        key = previous if start_ms == NO_TIME else start_ms
+        if key < previous:
+            self._ordered = False
+        end_ms = NO_TIME if cue.end_ms is None else cue.end_ms
+        self.start_ms.append(start_ms)
+        self.end_ms.append(end_ms)
+        self._keys.append(key)
+        self._max_ends.append(max(self._max_ends[-1] if self._max_ends else 0, key if end_ms == NO_TIME else end_ms))
+        self.texts.append('\n'.join(cue.lines))
+
+    def extend(self, cues):
+        for cue in cues:
+            self.append(cue)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def cue(self, row):
+        start_ms, end_ms = self.start_ms[row], self.end_ms[row]
+        return Cue(
+            None if start_ms == NO_TIME else start_ms,
+            None if end_ms == NO_TIME else end_ms,
+            self.texts[row].split('\n'),
+        )
+
+    __getitem__ = cue
+
+    def __iter__(self):
+        return map(self.cue, range(len(self.texts)))
+
+    def _end(self, row):
+        return self.end_ms[row] if self.end_ms[row] != NO_TIME else self._keys[row]
+
+    def _overlaps(self, row, start_ms, end_ms):
+        key = self._keys[row]
+        end = self._end(row)
+        return (end_ms is None or key < end_ms) and (start_ms is None or key >= start_ms or end > start_ms)
+
+    def rows(self, start_ms=None, end_ms=None):
+        """Номера фраз, звучащих в промежутке [start_ms, end_ms) (None - без границы)
+
+        Фраза, начавшаяся раньше start_ms и еще не закончившаяся, тоже входит.
+        """
+        count = len(self.texts)
+        if start_ms is not None and end_ms is not None and start_ms >= end_ms:
+            return range(0)
+        if not self._ordered:
+            return [row for row in range(count) if self._overlaps(row, start_ms, end_ms)]
+
+        lo = 0 if start_ms is None else bisect_left(self._keys, start_ms)
+        hi = count if end_ms is None else bisect_left(self._keys, end_ms)
+        if not lo:
+            return range(lo, hi)
+
+        # Начавшиеся раньше start_ms фразы еще звучат только после первой
+        # строки, где наибольший конец превышает start_ms
+        first = bisect_right(self._max_ends, start_ms, 0, lo)
+        earlier = [row for row in range(first, lo) if self._end(row) > start_ms]
+        if len(earlier) == lo - first:
+            return range(first, hi)
+        return earlier + list(range(lo, hi))
+
+    def iter_cues(self, start_ms=None, end_ms=None):
+        """Cue фраз промежутка времени (см. rows)"""
+        return map(self.cue, self.rows(start_ms, end_ms))
+
+    def slice(self, start_ms=None, end_ms=None):
+        """Новая таблица с фразами промежутка времени (см. rows)"""
+        rows = self.rows(start_ms, end_ms)
+        if isinstance(rows, range):
+            table = CueTable()
+            table.start_ms = self.start_ms[rows.start:rows.stop]
+            table.end_ms = self.end_ms[rows.start:rows.stop]
+            table.texts = self.texts[rows.start:rows.stop]
+            table._keys = self._keys[rows.start:rows.stop]
+            table._max_ends = _max_ends(table._keys, table.end_ms)
+            return table
+        return CueTable.from_columns(
+            (self.start_ms[row] for row in rows),
+            (self.end_ms[row] for row in rows),
+            (self.texts[row] for row in rows),
+        )
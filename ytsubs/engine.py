@@ -0,0 +1,1364 @@
+# -*- coding: utf-8 -*-
+"""
+Движок загрузки субтитров без графического интерфейса
+
+yt-dlp загружается лениво, при первом создании сессии, поэтому импорт модуля
+не требует ни дисплея, ни установленного yt-dlp.
+"""
+
+import collections
+import importlib.util
+import itertools
+import os
+import queue
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+
+from .cache import (
+    CACHE_FILENAME,
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_CACHE_TTL,
+    LISTING_CACHE_TTL,
+    PLAYLIST_INFO_KEYS,
+    URL_EXPIRY_MARGIN,
+    VIDEO_INFO_KEYS,
+    ListingRecorder,
+    trim_info,
+    url_expiry,
+)
+from .cues import CueTable
+from .files import directory_lock
+from .jobs import JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING, JobQueue
+from .manifest import STATUS_DONE, STATUS_FAILED, STATUS_NOT_FOUND, DownloadManifest
+from .report import REPORT_FILENAME, RunReport
+from .sync import SyncStateStore
+from .throttle import DEFAULT_REQUEST_RATE, RequestGovernor, ThrottledError, is_throttling_error
+from .vtt import (
+    DEFAULT_DEDUP_WINDOW,
+    SUBTITLE_FORMAT_LABELS,
+    SUBTITLE_FORMATS,
+    get_output_suffix,
+    open_vtt_bytes,
+    render_txt,
+    write_txt_file,
+)
+
+YOUTUBE_URL_PATTERNS = [
+    re.compile(r'youtube\.com/watch\?v='),
+    re.compile(r'youtube\.com/channel/'),
+    re.compile(r'youtube\.com/c/'),
+    re.compile(r'youtube\.com/@'),
+    re.compile(r'youtu\.be/'),
+    re.compile(r'youtube\.com/user/'),
+]
+
+VIDEO_URL_RE = re.compile(r'youtube\.com/(watch\?v=|shorts/|live/)|youtu\.be/')
+
+UNSAFE_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
+
+# Признак конца списка видео (пустые записи в списке - None)
+_NO_VIDEO = object()
+
+# Результат загрузки видео, прерванной ограничением запросов: видео ставится в очередь повторно
+THROTTLED = 'throttled'
+THROTTLE_RETRY_ROUNDS = 3  # Сколько раз повторять такие видео в одном запуске
+
+# Сколько каналов пакетной загрузки обрабатываются одновременно (видео берутся из них по очереди)
+MAX_ACTIVE_CHANNELS = 8
+
+# Итог обработки видео для отчета о запуске
+_REPORT_RESULTS = {None: 'stopped', True: 'done', False: 'failed', 'skipped': 'skipped', THROTTLED: 'throttled'}
+
+# Пояснения к типу найденной дорожки для лога
+SUBTITLE_KIND_LABELS = {
+    'manual': "",
+    'auto': " (автоматические)",
+    'translated': " (переведенные)",
+    'alternative': " (найден альтернативный язык)",
+}
+
+
+def is_yt_dlp_available():
+    """Проверка наличия yt-dlp без его импорта"""
+    return importlib.util.find_spec('yt_dlp') is not None
+
+
+def import_yt_dlp():
+    """Ленивый импорт yt-dlp"""
+    try:
+        import yt_dlp
+    except ImportError:
+        raise ImportError("Необходимо установить yt-dlp:\npip install yt-dlp") from None
+    return yt_dlp
+
+
+def create_http_session(pool_size):
+    """HTTP-сессия requests с пулом keep-alive соединений"""
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        raise ImportError("Необходимо установить requests:\npip install requests") from None
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def validate_url(url):
+    """Проверка и определение типа URL"""
+    return any(pattern.search(url) for pattern in YOUTUBE_URL_PATTERNS)
+
+
+def parse_language_code(value):
+    """Извлекает код языка из значения вида 'ru - Русский'"""
+    if ' - ' in value:
+        return value.split(' - ')[0]
+    return value
+
+
+def parse_language_codes(value):
+    """Список кодов языков по приоритету из значения вида 'ru, en' или 'ru - Русский'"""
+    codes = []
+    for part in value.split(','):
+        code = parse_language_code(part.strip()).strip()
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def sanitize_filename(name):
+    """Очистка имени файла или папки от недопустимых символов"""
+    return UNSAFE_FILENAME_CHARS.sub('_', name)
+
+
+def channel_display_name(info, channel_dir):
+    """Название канала видео для поискового индекса: из информации о видео, иначе имя папки"""
+    return info.get('channel') or info.get('uploader') or os.path.basename(channel_dir)
+
+
+def pick_vtt_format(formats):
+    """Формат дорожки в VTT, если он есть, иначе первый доступный"""
+    vtt_formats = [f for f in formats if f.get('ext') == 'vtt']
+    return (vtt_formats or formats)[0]
+
+
+def _auto_caption_kind(formats):
+    # Машинный перевод автоматических субтитров YouTube отдает с параметром tlang
+    if any('tlang=' in f.get('url', '') for f in formats):
+        return 'translated'
+    return 'auto'
+
+
+def _select_language_track(info, lang):
+    """Дорожка на заданном языке: оригинальные -> автоматические -> переведенные"""
+    subtitles = info.get('subtitles') or {}
+    automatic_captions = info.get('automatic_captions') or {}
+
+    if subtitles.get(lang):
+        return lang, 'manual', pick_vtt_format(subtitles[lang])
+    if automatic_captions.get(lang):
+        formats = automatic_captions[lang]
+        return lang, _auto_caption_kind(formats), pick_vtt_format(formats)
+    return None
+
+
+def _select_alternative_track(info):
+    """Английские, затем любые другие доступные субтитры"""
+    subtitles = info.get('subtitles') or {}
+    automatic_captions = info.get('automatic_captions') or {}
+
+    if subtitles.get('en'):
+        return 'en', 'alternative', pick_vtt_format(subtitles['en'])
+    for track_lang, formats in subtitles.items():
+        if formats:
+            return track_lang, 'alternative', pick_vtt_format(formats)
+
+    # Среди автоматических предпочитаем исходный язык видео, а не машинный перевод
+    auto_langs = sorted(
+        (track_lang for track_lang, formats in automatic_captions.items() if formats),
+        key=lambda track_lang: (
+            _auto_caption_kind(automatic_captions[track_lang]) == 'translated',
+            track_lang != 'en',
+        ),
+    )
+    if auto_langs:
+        track_lang = auto_langs[0]
+        return track_lang, 'alternative', pick_vtt_format(automatic_captions[track_lang])
+
+    return None
+
+
+def select_subtitle_track(info, lang):
+    """Выбор дорожки субтитров по информации о видео, до загрузки
+
+    Порядок: оригинальные -> автоматические -> переведенные на выбранном языке,
+    затем английские и любые другие доступные субтитры.
+    Возвращает (язык дорожки, тип, формат) или None.
+    """
+    return _select_language_track(info, lang) or _select_alternative_track(info)
+
+
+def select_subtitle_tracks(info, languages):
+    """Выбор дорожек для списка языков: [(язык, язык дорожки, тип, формат)]
+
+    Для каждого языка порядок свой: оригинальные -> автоматические -> переведенные.
+    Английские или любые другие субтитры берутся, только если не найден ни один
+    из языков, и сохраняются под первым языком списка.
+    """
+    tracks = []
+    for lang in languages:
+        track = _select_language_track(info, lang)
+        if track is not None:
+            tracks.append((lang, *track))
+
+    if not tracks and languages:
+        track = _select_alternative_track(info)
+        if track is not None:
+            tracks.append((languages[0], *track))
+    return tracks
+
+
+def get_txt_filename(safe_title, lang, subtitle_format):
+    """Имя итогового файла в зависимости от выбранного формата"""
+    return f'{safe_title}.{lang}{get_output_suffix(subtitle_format)}'
+
+
+class YoutubeDLSession:
+    """Экземпляры yt-dlp, общие для всего запуска загрузки
+
+    YoutubeDL создается один раз на поток и переиспользуется для всех видео,
+    поэтому экстракторы и HTTP-соединения не создаются заново для каждого видео.
+    Путь сохранения меняется для каждого видео без пересоздания экземпляра.
+    """
+
+    def __init__(self, params):
+        self.yt_dlp = import_yt_dlp()
+        self.params = params
+        self._local = threading.local()
+        self._instances = []
+        self._lock = threading.Lock()
+
+    def get_ydl(self):
+        """Экземпляр YoutubeDL текущего потока"""
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            ydl = self.yt_dlp.YoutubeDL(dict(self.params))
+            self._local.ydl = ydl
+            with self._lock:
+                self._instances.append(ydl)
+        return ydl
+
+    @contextmanager
+    def _override_params(self, outtmpl=None, **params):
+        """Временная замена параметров yt-dlp текущего потока"""
+        ydl = self.get_ydl()
+        if outtmpl is not None:
+            outtmpl_params = ydl.params.get('outtmpl')
+            if isinstance(outtmpl_params, dict):
+                params['outtmpl'] = dict(outtmpl_params, default=outtmpl)
+            else:
+                params['outtmpl'] = {'default': outtmpl}
+
+        saved = {key: ydl.params.get(key) for key in params}
+        ydl.params.update(params)
+        try:
+            yield ydl
+        finally:
+            ydl.params.update(saved)
+
+    def extract_info(self, url, download=False, process=True, outtmpl=None, **params):
+        """Извлечение информации с временной заменой параметров yt-dlp"""
+        with self._override_params(outtmpl, **params) as ydl:
+            return ydl.extract_info(url, download=download, process=process)
+
+    def process_ie_result(self, info, download=False, outtmpl=None, **params):
+        """Обработка уже извлеченной информации (например, запись выбранных субтитров)"""
+        with self._override_params(outtmpl, **params) as ydl:
+            return ydl.process_ie_result(info, download=download)
+
+    def close(self):
+        with self._lock:
+            instances, self._instances = self._instances, []
+        for ydl in instances:
+            ydl.__exit__(None, None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+@dataclass
+class DownloadOptions:
+    """Настройки одного запуска загрузки"""
+    output_dir: str
+    language: str = 'ru'  # Один код или несколько через запятую по приоритету: 'ru, en, de'
+    subtitle_format: str = 'with_timings'
+    max_videos: int = 50
+    max_workers: int = 4
+    in_memory: bool = False  # Загружать субтитры в память, без временных VTT файлов
+    retry_failed: bool = False  # Повторить видео, которые не удалось загрузить в прошлый раз
+    sync: bool = False  # Обрабатывать только видео, вышедшие после прошлой синхронизации
+    dedup_window: float = DEFAULT_DEDUP_WINDOW  # Окно (секунды), в котором убираются повторы строк
+    channel_archive: bool = False  # Дополнительно собирать все фразы канала в один колоночный файл
+    search_index: bool = False  # Добавлять фразы в поисковый индекс папки сохранения
+    cache_ttl: float = DEFAULT_CACHE_TTL  # Время жизни кеша информации о видео (секунды), 0 - без кеша
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    use_cache: bool = True  # False - не читать кеш (свежие ответы все равно сохраняются)
+    request_rate: float = DEFAULT_REQUEST_RATE  # Запросов к YouTube в секунду, 0 - без ограничения
+    report_file: str = None  # Отчет о запуске (JSON), по умолчанию в папке сохранения
+    profile: bool = False  # Добавить в отчет cProfile и распределение памяти (tracemalloc)
+    pack_output: bool = False  # Сохранять тексты в сжатый архив канала вместо отдельных файлов
+
+
+class _ChannelRun:
+    """Состояние загрузки одного канала, плейлиста или видео в общем пуле потоков"""
+
+    def __init__(self, url, info, info_from_cache=False):
+        self.url = url
+        self.info = info
+        self.info_from_cache = info_from_cache
+        self.is_video = 'entries' not in info
+        self.name = None
+        self.output_dir = None
+        self.manifest = None
+        self.videos = None  # Итератор (номер, видео), список получается лениво
+        self.resources = ExitStack()  # Освобождение папки канала при завершении
+        self.sync_store = None
+        self.sync_state = None
+        self.recorder = None  # Запоминание списка для кеша
+        self.counts = {'discovered': 0, 'done': 0, 'success': 0, 'skipped': 0}
+        self.deferred = []  # Видео, отложенные из-за ограничения запросов
+        self.in_flight = 0  # Видео в очереди и в обработке
+        self.exhausted = False  # Список видео получен полностью
+        self.closed = False
+        self.error = None  # Ошибка получения списка видео
+
+
+class SubtitlesDownloader:
+    """Загрузка субтитров с видео или канала
+
+    Сообщения передаются в функцию log, прогресс по каналу - в progress(done, discovered):
+    количество обработанных и уже найденных в списке канала видео.
+    Обе функции вызываются из рабочих потоков.
+    """
+
+    def __init__(self, options, log=None, progress=None):
+        self.options = options
+        self._log = log or (lambda message: None)
+        self.progress = progress
+        self.report = RunReport()  # Замеры по этапам, заменяется в начале каждого запуска
+        self.ydl_session = None  # Создается на время одного запуска загрузки
+        self.http_session = None  # Только при загрузке субтитров в память
+        self.track_executor = None  # Параллельная загрузка дорожек одного видео (несколько языков в памяти)
+        self.channel_archives = {}  # Сводные файлы открытых каналов по папкам
+        self.transcript_archives = {}  # Сжатые архивы текстов открытых каналов по папкам
+        self._folders = {}  # Открытые папки каналов: журнал загрузок и сводный файл
+        self._folders_lock = threading.Lock()
+        self.jobs = None  # Очередь заданий во время пакетной загрузки
+        self._job_urls = None  # Задания этого запуска (None - и незавершенные прошлых)
+        self._active_videos = set()  # (папка канала, id) видео, которые сейчас загружаются
+        self._active_lock = threading.Lock()
+        self.search_index = None  # Поисковый индекс на время запуска
+        self.metadata_cache = None  # Кеш информации о видео и списков каналов
+        self.governor = None  # Регулятор запросов на время запуска
+        self._stop_event = threading.Event()
+
+    def log(self, message):
+        with self.report.stage('log'):
+            self._log(message)
+
+    @property
+    def is_stopped(self):
+        return self._stop_event.is_set()
+
+    def stop(self):
+        """Остановка загрузки: новые видео больше не начинаются"""
+        self._stop_event.set()
+
+    @property
+    def languages(self):
+        return parse_language_codes(self.options.language)
+
+    def _report_progress(self, done, total):
+        if self.progress is not None:
+            self.progress(done, total)
+
+    def create_ydl_session(self):
+        """Общая на весь запуск сессия yt-dlp"""
+        return YoutubeDLSession({
+            'writesubtitles': True,
+            'writeautomaticsub': True,  # Всегда включаем автоматические субтитры
+            'subtitleslangs': self.languages,
+            'subtitlesformat': 'vtt',
+            'skip_download': True,
+            'ignore_no_formats_error': True,  # Нужны только субтитры, форматы видео не важны
+            'quiet': True,
+            'no_warnings': True,
+        })
+
+    def request(self, stage, func, *args, **kwargs):
+        """Запрос к YouTube через регулятор запросов (время запроса учитывается в этапе stage)
+
+        Ответы 429/5xx и пустые ответы превращаются в ThrottledError, после
+        чего регулятор делает паузу и уменьшает число параллельных загрузок.
+        """
+        governor = self.governor
+        if governor is None:
+            with self.report.stage(stage):
+                return func(*args, **kwargs)
+
+        with self.report.stage('wait'):
+            governor.request()
+        try:
+            with self.report.stage(stage):
+                result = func(*args, **kwargs)
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            delay = governor.on_throttled()
+            if delay is not None:
+                self.log(f"YouTube ограничивает запросы, пауза {delay:.1f} с, "
+                         f"параллельных загрузок: {governor.concurrency}")
+            if isinstance(e, ThrottledError):
+                raise
+            raise ThrottledError(str(e)) from e
+
+        concurrency = governor.on_success()
+        if concurrency is not None:
+            self.log(f"Параллельных загрузок: {concurrency}")
+        return result
+
+    def extract_unprocessed(self, url):
+        """Информация без обработки: у каналов список видео остается ленивым"""
+        info = self.request('extract', self.ydl_session.extract_info, url, process=False)
+        while info.get('_type') in ('url', 'url_transparent'):
+            info = self.request('extract', self.ydl_session.extract_info, info['url'], process=False)
+        return info
+
+    @staticmethod
+    def is_video_entry(entry):
+        return entry.get('ie_key') == 'Youtube' or bool(VIDEO_URL_RE.search(entry.get('url') or ''))
+
+    def iter_playlist_entries(self, info):
+        """Ленивый обход видео канала или плейлиста
+
+        Страницы списка запрашиваются по мере обхода, вложенные плейлисты
+        (например, вкладки канала) раскрываются на месте.
+        """
+        for entry in info.get('entries') or []:
+            if not entry:
+                yield entry
+            elif entry.get('_type') == 'playlist':
+                yield from self.iter_playlist_entries(entry)
+            elif entry.get('_type') in ('url', 'url_transparent') and not self.is_video_entry(entry):
+                nested = self.extract_unprocessed(entry['url'])
+                if 'entries' in nested:
+                    yield from self.iter_playlist_entries(nested)
+                else:
+                    yield nested
+            else:
+                yield entry
+
+    def get_video_info(self, url):
+        """Получение информации о видео/канале
+
+        Список видео канала не загружается целиком: entries остается ленивым.
+        """
+        try:
+            return self.extract_unprocessed(url)
+        except Exception as e:
+            raise Exception(f"Ошибка получения информации: {str(e)}")
+
+    def _cache_video_info(self, info, *keys):
+        """Сохранение информации о видео в кеш до истечения ссылок на дорожки"""
+        expiry = url_expiry(info)
+        expires = expiry - URL_EXPIRY_MARGIN if expiry else None
+        trimmed = trim_info(info, VIDEO_INFO_KEYS)
+        for key in keys:
+            self.metadata_cache.put(key, {'kind': 'video', 'info': trimmed}, expires)
+
+    def get_video_info_cached(self, url):
+        """Информация о видео или канале с учетом кеша: (info, взята ли из кеша)
+
+        Список канала из кеша используется, только если в нем достаточно видео
+        для ограничения "макс. видео"; при синхронизации он запрашивается заново.
+        """
+        cache = self.metadata_cache
+        if cache is not None and self.options.use_cache:
+            cached = cache.get(f"url:{url}")
+            if cached is not None and cached['kind'] == 'video':
+                return cached['info'], True
+            if cached is not None and not self.options.sync and (
+                cached['complete'] or len(cached['entries']) >= self.options.max_videos
+            ):
+                return dict(cached['info'], entries=cached['entries']), True
+
+        info = self.get_video_info(url)
+        if cache is not None and 'entries' not in info:
+            self._cache_video_info(info, f"url:{url}", f"video:{info.get('id')}")
+        return info, False
+
+    def extract_video_info(self, video_url, video_id=None, refresh=False):
+        """Информация о видео из кеша или от YouTube: (info, взята ли из кеша)"""
+        cache = self.metadata_cache
+        if cache is not None and video_id and self.options.use_cache and not refresh:
+            cached = cache.get(f"video:{video_id}")
+            if cached is not None:
+                return cached['info'], True
+
+        info = self.extract_unprocessed(video_url)
+        if cache is not None and (video_id or info.get('id')):
+            self._cache_video_info(info, f"video:{video_id or info.get('id')}")
+        return info, False
+
+    def iter_channel_videos(self, info, sync_state=None, recorder=None):
+        """Видео канала по мере получения страниц списка
+
+        Ограничение "макс. видео" и остановка синхронизации на известном видео
+        применяются во время обхода, лишние страницы не запрашиваются.
+        Полученные видео можно запомнить для кеша (recorder).
+        """
+        entries = self.iter_playlist_entries(info)
+        if recorder is not None:
+            entries = recorder.wrap(entries)
+        limit = max(0, self.options.max_videos)
+        if sync_state is None:
+            yield from itertools.islice(entries, limit)
+            return
+
+        entries = itertools.takewhile(lambda entry: not (entry and sync_state.is_known(entry)), entries)
+        for count, entry in enumerate(entries):
+            # Список обрезан ограничением раньше, чем дошел до известного видео
+            if count == limit:
+                return
+            if entry:
+                sync_state.observe(entry)
+            yield entry
+        sync_state.caught_up = True
+
+    def download_subtitles_for_video(self, video_url, video_title, output_dir, video_id=None, manifest=None, info=None,
+                                     languages=None, info_from_cache=False):
+        """Загрузка субтитров для одного видео на всех выбранных языках
+
+        Информация о видео извлекается один раз (или берется из кеша), все
+        дорожки берутся из нее. Результат по каждому языку записывается в журнал
+        загрузок папки канала, если он передан. Уже извлеченную информацию о
+        видео можно передать в info.
+
+        Если YouTube ограничил запросы, видео не отмечается в журнале и
+        возвращается THROTTLED, чтобы его можно было повторить позже.
+        """
+        safe_title = sanitize_filename(video_title)
+        languages = languages or self.languages
+        results = {lang: (STATUS_FAILED, None, None) for lang in languages}
+
+        # Если URL содержит только ID, формируем полный URL
+        if not video_url.startswith('http'):
+            video_url = f"https://www.youtube.com/watch?v={video_url}"
+
+        try:
+            # Доступные дорожки берем из информации о видео, без обработки форматов
+            if info is None:
+                info, info_from_cache = self.extract_video_info(video_url, video_id)
+            video_id = video_id or info.get('id')
+
+            while True:
+                # Запасной язык выбирается по полному списку, даже если часть языков уже загружена
+                tracks = [track for track in select_subtitle_tracks(info, self.languages) if track[0] in languages]
+                found = {lang for lang, _, _, _ in tracks}
+                for lang in languages:
+                    if lang not in found:
+                        results[lang] = (STATUS_NOT_FOUND, None, None)
+                if not tracks:
+                    self.report.fail('not_found')
+                    lang_label = f" ({', '.join(languages)})" if len(self.languages) > 1 else ""
+                    self.log(f"✗ Субтитры не найдены{lang_label} для: {video_title}")
+                    return False
+
+                txt_files = {
+                    lang: os.path.join(output_dir, get_txt_filename(safe_title, lang, self.options.subtitle_format))
+                    for lang, _, _, _ in tracks
+                }
+                # Фразы для сводного файла канала и поискового индекса собираются во время конвертации
+                archive = self.channel_archives.get(output_dir) if video_id else None
+                search_index = self.search_index if video_id else None
+                collect_cues = archive is not None or search_index is not None
+                cue_lists = {lang: CueTable() for lang in txt_files} if collect_cues else None
+
+                try:
+                    if self.options.in_memory:
+                        saved = self.fetch_tracks_in_memory(info, tracks, txt_files, video_title, cue_lists)
+                    else:
+                        saved = self.download_tracks_to_files(
+                            info, tracks, safe_title, output_dir, txt_files, cue_lists,
+                        )
+                except Exception as e:
+                    if not info_from_cache or isinstance(e, ThrottledError):
+                        raise
+                    saved = {}
+
+                # Ссылки на дорожки из кеша могли перестать работать: один раз повторяем со свежей информацией
+                if info_from_cache and not any(saved.values()):
+                    self.log(f"Данные из кеша устарели, повторный запрос: {video_title}")
+                    info, info_from_cache = self.extract_video_info(video_url, video_id, refresh=True)
+                    continue
+                break
+
+            for lang, _, kind, _ in tracks:
+                if saved.get(lang):
+                    # Одно и то же название канала в сводном файле и в индексе (см. search.index_archives)
+                    channel = channel_display_name(info, output_dir)
+                    if archive is not None:
+                        with self.report.stage('archive'):
+                            archive.add_video(video_id, lang, video_title, cue_lists[lang], channel)
+                    if search_index is not None:
+                        with self.report.stage('index'):
+                            search_index.add_video(channel, video_id, lang, video_title, cue_lists[lang])
+                    results[lang] = (STATUS_DONE, kind, os.path.basename(txt_files[lang]))
+                    lang_label = f" [{lang}]" if len(self.languages) > 1 else ""
+                    self.log(f"✓ Субтитры сохранены{lang_label}{SUBTITLE_KIND_LABELS[kind]}: {video_title}")
+                else:
+                    results[lang] = (STATUS_FAILED, kind, None)
+            return any(saved.values())
+
+        except ThrottledError:
+            results = None
+            self.report.fail('throttled')
+            self.log(f"Загрузка отложена из-за ограничения запросов: {video_title}")
+            return THROTTLED
+
+        except Exception as e:
+            self.report.fail(f"error:{type(e).__name__}")
+            self.log(f"Ошибка загрузки субтитров для '{video_title}': {str(e)}")
+            return False
+
+        finally:
+            if manifest is not None and video_id and results is not None:
+                for lang, (status, kind, output) in results.items():
+                    manifest.record(video_id, lang, self.options.subtitle_format, status, kind, output, video_title)
+
+    def download_tracks_to_files(self, info, tracks, safe_title, output_dir, txt_files, cue_lists=None):
+        """Сохранение выбранных дорожек VTT средствами yt-dlp с последующей конвертацией
+
+        Все дорожки видео сохраняются одним вызовом yt-dlp. Возвращает {язык: сохранено}.
+        """
+        # Экземпляр yt-dlp общий для запуска, меняются только путь сохранения и языки дорожек
+        info = self.request(
+            'fetch',
+            self.ydl_session.process_ie_result,
+            info,
+            download=True,
+            outtmpl=os.path.join(output_dir, safe_title.replace('%', '%%') + '.%(ext)s'),
+            subtitleslangs=[track_lang for _, track_lang, _, _ in tracks],
+        )
+
+        # Пути к файлам yt-dlp сообщает сам, поиск по папке не нужен
+        requested = info.get('requested_subtitles') or {}
+        saved = {}
+        for lang, track_lang, _, _ in tracks:
+            vtt_file = (requested.get(track_lang) or {}).get('filepath')
+            if not vtt_file:
+                if len(tracks) == 1:
+                    raise Exception(f"yt-dlp не сохранил субтитры ({track_lang})")
+                self.report.fail('not_saved')
+                self.log(f"yt-dlp не сохранил субтитры ({track_lang})")
+                saved[lang] = False
+                continue
+            with self.report.stage('probe'):
+                size = os.path.getsize(vtt_file)
+            self.report.add_bytes('fetch', size)
+            if size == 0:
+                # Пустой ответ вместо дорожки - признак ограничения запросов
+                os.remove(vtt_file)
+                raise ThrottledError(f"Пустой файл субтитров ({track_lang})")
+            on_cue = cue_lists[lang].append if cue_lists is not None else None
+            saved[lang] = self.convert_subtitle_file(vtt_file, txt_files[lang], on_cue, info, lang)
+        return saved
+
+    def convert_subtitle_file(self, vtt_file, txt_file, on_cue=None, info=None, lang=None):
+        """Конвертация сохраненного VTT в итоговый формат и удаление VTT"""
+        try:
+            with self.report.stage('convert'), open(vtt_file, 'r', encoding='utf-8') as src:
+                self.write_output(src, txt_file, on_cue, info, lang)
+        except Exception as e:
+            self.report.fail('convert')
+            self.log(f"Ошибка конвертации VTT в TXT: {str(e)}")
+            return False
+
+        os.remove(vtt_file)  # Удаляем VTT файл
+        return True
+
+    def fetch_tracks_in_memory(self, info, tracks, txt_files, video_title, cue_lists=None):
+        """Загрузка дорожек в память, параллельно, если языков несколько
+
+        Возвращает {язык: сохранено}.
+        """
+        def fetch(lang, track_format):
+            on_cue = cue_lists[lang].append if cue_lists is not None else None
+            return self.fetch_subtitles_in_memory(info, track_format, txt_files[lang], on_cue, lang)
+
+        if len(tracks) == 1 or self.track_executor is None:
+            futures = None
+        else:
+            futures = {
+                lang: self.track_executor.submit(fetch, lang, track_format)
+                for lang, _, _, track_format in tracks
+            }
+
+        saved = {}
+        for lang, _, _, track_format in tracks:
+            try:
+                if futures is None:
+                    saved[lang] = fetch(lang, track_format)
+                else:
+                    saved[lang] = futures[lang].result()
+            except Exception as e:
+                # При ограничении запросов видео повторяется целиком
+                if len(tracks) == 1 or isinstance(e, ThrottledError):
+                    if futures is not None:
+                        from concurrent.futures import wait
+
+                        # Остальные дорожки не должны дописывать файлы видео, которое уже поставлено на повтор
+                        for future in futures.values():
+                            future.cancel()
+                        wait(futures.values())
+                    raise
+                self.log(f"Ошибка загрузки субтитров ({lang}) для '{video_title}': {str(e)}")
+                saved[lang] = False
+        return saved
+
+    def fetch_subtitles_in_memory(self, info, track_format, txt_file, on_cue=None, lang=None):
+        """Загрузка дорожки субтитров по URL прямо в память, на диск пишется только TXT"""
+        if track_format.get('data') is not None:
+            data = track_format['data'].encode('utf-8')
+        else:
+            data = self.request('fetch', self.http_get, track_format['url'], info.get('http_headers'))
+            self.report.add_bytes('fetch', len(data))
+
+        try:
+            with self.report.stage('convert'), open_vtt_bytes(data) as src:
+                self.write_output(src, txt_file, on_cue, info, lang)
+        except Exception as e:
+            self.report.fail('convert')
+            self.log(f"Ошибка конвертации VTT в TXT: {str(e)}")
+            return False
+        return True
+
+    def write_output(self, lines, txt_file, on_cue=None, info=None, lang=None):
+        """Запись итогового текста: отдельным файлом или в сжатый архив папки канала
+
+        В архиве текст хранится под именем, которое было бы у файла.
+        """
+        subtitle_format = self.options.subtitle_format
+        transcripts = self.transcript_archives.get(os.path.dirname(txt_file))
+        if transcripts is None:
+            write_txt_file(lines, txt_file, subtitle_format, self.options.dedup_window, on_cue)
+            return
+
+        text = render_txt(lines, subtitle_format, self.options.dedup_window, on_cue)
+        info = info or {}
+        transcripts.add(
+            os.path.basename(txt_file), text,
+            video_id=info.get('id'), lang=lang, title=info.get('title'), format=subtitle_format,
+        )
+
+    def http_get(self, url, headers=None):
+        """Содержимое ответа по URL через общий пул соединений"""
+        response = self.http_session.get(url, headers=headers, timeout=30)
+        response.raise_for_status()
+        if not response.content.strip():
+            raise ThrottledError("Пустой ответ сервера")
+        return response.content
+
+    @contextmanager
+    def open_channel_archive(self, channel_output_dir):
+        """Сводный файл канала на время загрузки, если он включен в настройках"""
+        if not self.options.channel_archive:
+            yield None
+            return
+
+        from .columnar import ChannelCueWriter
+
+        archive = self.channel_archives[channel_output_dir] = ChannelCueWriter(channel_output_dir)
+        try:
+            yield archive
+        finally:
+            self.channel_archives.pop(channel_output_dir, None)
+            archive.close()
+            if os.path.exists(archive.path):
+                self.log(f"Сводный файл канала: {archive.path}")
+
+    @contextmanager
+    def open_transcript_archive(self, channel_output_dir):
+        """Сжатый архив текстов канала на время загрузки, если он включен в настройках"""
+        if not self.options.pack_output:
+            yield None
+            return
+
+        from .transcripts import TranscriptArchiveWriter, has_archive
+
+        transcripts = self.transcript_archives[channel_output_dir] = TranscriptArchiveWriter(channel_output_dir)
+        try:
+            yield transcripts
+        finally:
+            self.transcript_archives.pop(channel_output_dir, None)
+            transcripts.close()
+            if has_archive(channel_output_dir):
+                self.log(f"Архив субтитров канала: {channel_output_dir}")
+
+    def pending_languages(self, manifest, video_id):
+        """Языки, которые еще нужно загрузить для видео (по журналу загрузок)"""
+        if not video_id:
+            return self.languages
+        return [
+            lang for lang in self.languages
+            if not manifest.should_skip(video_id, lang, self.options.subtitle_format, self.options.retry_failed)
+        ]
+
+    def open_channel(self, url, info, output_dir, info_from_cache=False):
+        """Подготовка загрузки канала, плейлиста или одного видео
+
+        Создает папку канала, открывает журнал загрузок и сводный файл, при
+        синхронизации загружает состояние канала. Видео канала получаются
+        лениво, по мере обработки.
+        """
+        channel = _ChannelRun(url, info, info_from_cache)
+        if channel.is_video:
+            videos = iter([info])
+            channel_name = info.get('uploader', info.get('channel', 'Unknown_Channel'))
+        else:
+            if self.options.sync:
+                channel.sync_store = SyncStateStore(output_dir)
+                channel.sync_state = channel.sync_store.get(url)
+                if not channel.sync_state.is_empty:
+                    self.log("Синхронизация: только видео, вышедшие после прошлого запуска")
+
+            # Полученный список канала запоминается для следующих запусков
+            if self.metadata_cache is not None and not info_from_cache and channel.sync_state is None:
+                channel.recorder = ListingRecorder()
+
+            videos = iter(self.iter_channel_videos(info, channel.sync_state, channel.recorder))
+
+            # Получаем название канала
+            channel_name = info.get('title', info.get('uploader', 'Unknown_Channel'))
+            if not channel_name or channel_name == 'Unknown_Channel':
+                # Пробуем получить название из первого видео
+                first_video = next(videos, _NO_VIDEO)
+                if first_video is not _NO_VIDEO:
+                    videos = itertools.chain([first_video], videos)
+                    if first_video:
+                        channel_name = first_video.get('uploader', first_video.get('channel', 'Unknown_Channel'))
+
+        # Создаем папку для канала (даже для одного видео)
+        channel.name = channel_name
+        channel.output_dir = os.path.join(output_dir, sanitize_filename(channel_name))
+        os.makedirs(channel.output_dir, exist_ok=True)
+
+        if channel.is_video:
+            self.log(f"Видео: {info.get('title', 'Unknown_Video')}")
+        self.log(f"Канал: {channel_name}")
+        self.log(f"Папка для сохранения: {channel.output_dir}")
+
+        channel.manifest = self._acquire_folder(channel.output_dir)
+        channel.resources.callback(self._release_folder, channel.output_dir)
+        channel.videos = enumerate(self.report.iter_timed('listing', videos), 1)
+        return channel
+
+    def _acquire_folder(self, channel_output_dir):
+        """Журнал загрузок папки канала; сводный файл, архив и журнал общие для заданий одной папки"""
+        with self._folders_lock:
+            folder = self._folders.get(channel_output_dir)
+            if folder is None:
+                # При ошибке открытия уже открытое закрывается сразу
+                with ExitStack() as resources:
+                    transcripts = resources.enter_context(self.open_transcript_archive(channel_output_dir))
+                    output_exists = None
+                    if transcripts is not None:
+                        # Тексты, сохраненные раньше отдельными файлами, тоже не загружаются заново
+                        output_exists = lambda output: (
+                            output in transcripts or os.path.exists(os.path.join(channel_output_dir, output))
+                        )
+                    manifest = resources.enter_context(DownloadManifest(channel_output_dir, output_exists))
+                    resources.enter_context(self.open_channel_archive(channel_output_dir))
+                    resources = resources.pop_all()
+                folder = self._folders[channel_output_dir] = {'users': 0, 'manifest': manifest, 'resources': resources}
+            folder['users'] += 1
+            return folder['manifest']
+
+    def _release_folder(self, channel_output_dir):
+        with self._folders_lock:
+            folder = self._folders[channel_output_dir]
+            folder['users'] -= 1
+            if folder['users']:
+                return
+            del self._folders[channel_output_dir]
+        folder['resources'].close()
+
+    def close_channel(self, channel):
+        """Завершение загрузки канала: журнал, сводный файл, кеш списка, синхронизация, итоги"""
+        channel.resources.close()
+
+        # Прерванный запуск не сдвигает отметку, чтобы не потерять необработанные видео
+        stopped = self.is_stopped or channel.error is not None
+        if channel.recorder is not None and not stopped:
+            self.metadata_cache.put(f"url:{channel.url}", {
+                'kind': 'playlist',
+                'info': trim_info(channel.info, PLAYLIST_INFO_KEYS),
+                'entries': channel.recorder.entries,
+                'complete': channel.recorder.complete,
+            }, time.time() + LISTING_CACHE_TTL)
+        # Отложенные из-за ограничения запросов видео не загружены: отметка остается
+        # перед ними, и следующий запуск с синхронизацией их повторит
+        if channel.sync_store is not None and not stopped and not channel.deferred:
+            if channel.sync_state.commit():
+                channel.sync_store.save(channel.url, channel.sync_state)
+            else:
+                self.log("Синхронизация: из-за ограничения \"макс. видео\" список не дошел до прошлых видео, "
+                         "отметка не сдвинута (увеличьте ограничение, чтобы загрузить пропущенные)")
+
+        counts = channel.counts
+        if self.jobs is not None:
+            if channel.error is not None:
+                status = JOB_FAILED
+            elif self.is_stopped or channel.deferred:
+                status = JOB_PENDING
+            else:
+                status = JOB_DONE
+            self.jobs.mark(channel.url, status, success=counts['success'], videos=counts['discovered'],
+                           **({'error': channel.error} if channel.error is not None else {}))
+
+        if channel.deferred:
+            self.log(f"Не загружено из-за ограничения запросов: {len(channel.deferred)} "
+                     f"(будут повторены при следующем запуске)")
+        label = f" ({channel.name})" if self.jobs is not None else ""
+        self.log(f"Завершено{label}! Успешно загружено субтитров: {counts['success']}/{counts['discovered']}")
+        if counts['skipped']:
+            self.log(f"Пропущено ранее обработанных видео: {counts['skipped']}")
+        self.log(f"Субтитры сохранены в папке: {channel.output_dir}")
+
+    def process_video(self, channel, i, video):
+        """Обработка одного видео канала в рабочем потоке
+
+        Возвращает True/False (сохранено ли), 'skipped', THROTTLED или None,
+        если видео не начато из-за остановки.
+        """
+        # Не начинаем новые видео после остановки
+        if self.is_stopped:
+            return None
+
+        label = f"[{channel.name} #{i}]" if self.jobs is not None else f"[{i}]"
+
+        # Проверяем, что у нас есть необходимая информация о видео
+        if not video:
+            self.log(f"{label} Пропуск: нет данных о видео")
+            return False
+
+        video_id = video.get('id')
+        if not video_id:
+            return self._process_video(channel, label, video, video_id, i)
+
+        # Одно видео из двух заданий с общей папкой канала загружается один раз
+        key = (channel.output_dir, video_id)
+        with self._active_lock:
+            if key in self._active_videos:
+                self.log(f"{label} Пропуск: видео уже загружается в другом задании")
+                return 'skipped'
+            self._active_videos.add(key)
+        try:
+            return self._process_video(channel, label, video, video_id, i)
+        finally:
+            with self._active_lock:
+                self._active_videos.discard(key)
+
+    def _process_video(self, channel, label, video, video_id, i):
+        """Загрузка видео, уже не занятого другим заданием (см. process_video)"""
+        video_title = video.get('title', f'Video_{i}')
+        video_url = video.get('webpage_url', video.get('url', ''))
+
+        # Уже обработанные видео (и языки) пропускаем по журналу, без обращения к сети
+        languages = self.pending_languages(channel.manifest, video_id)
+        if not languages:
+            if channel.is_video:
+                self.log("Видео уже обработано ранее, пропуск")
+            return 'skipped'
+
+        if not video_url:
+            self.log(f"{label} Пропуск: нет URL для '{video_title}'")
+            return False
+
+        self.log(f"{label} Загрузка субтитров: {video_title}")
+
+        try:
+            return self.download_subtitles_for_video(
+                video_url, video_title, channel.output_dir, video_id=video_id, manifest=channel.manifest,
+                languages=languages,
+                # У одного видео информация уже извлечена
+                info=video if channel.is_video else None,
+                info_from_cache=channel.is_video and channel.info_from_cache,
+            )
+        except Exception as e:
+            self.log(f"Ошибка для видео '{video_title}': {str(e)}")
+            return False
+
+    def download_channel(self, channel):
+        """Загрузка субтитров со всех видео одного канала или плейлиста"""
+        channels = iter([channel])
+        return self.download_channels(lambda: next(channels, None))
+
+    def download_channels(self, next_channel):
+        """Загрузка субтитров с видео нескольких каналов общим пулом потоков
+
+        next_channel() возвращает следующий открытый канал (open_channel) или
+        None, если новых нет; он вызывается каждый раз, когда есть место для
+        канала, поэтому задания, добавленные во время загрузки, тоже
+        подхватываются. Одновременно обрабатываются до MAX_ACTIVE_CHANNELS
+        каналов, видео берутся из них по очереди, по одному: большой канал не
+        задерживает остальные. Видео передаются в очередь загрузки по мере
+        получения списков, поэтому загрузка начинается сразу, а в памяти
+        хранится только небольшая очередь.
+
+        Возвращает количество успешно загруженных видео.
+        """
+        max_workers = max(1, self.options.max_workers)
+        self.log(f"Параллельных загрузок: {max_workers}")
+
+        channels = []
+        totals = {'discovered': 0, 'done': 0}
+        lock = threading.Lock()
+        # Ограниченная очередь: списки каналов не обгоняют загрузку больше, чем на пару видео на поток
+        work_queue = queue.Queue(maxsize=max_workers * 2)
+        governor = self.governor
+
+        def take_finished(channel):
+            # Канал закрывается один раз, когда его список получен и все видео обработаны
+            if channel.exhausted and not channel.in_flight and not channel.deferred and not channel.closed:
+                channel.closed = True
+                return True
+            return False
+
+        def count_result(channel, i, video, result):
+            with lock:
+                channel.in_flight -= 1
+                # Видео, отложенные из-за ограничения запросов, повторяются в конце
+                if result == THROTTLED:
+                    channel.deferred.append((i, video))
+                # Не начатые из-за остановки видео не учитываем
+                elif result is not None:
+                    channel.counts['done'] += 1
+                    totals['done'] += 1
+                    if result == 'skipped':
+                        channel.counts['skipped'] += 1
+                    elif result:
+                        channel.counts['success'] += 1
+                    self._report_progress(totals['done'], totals['discovered'])
+                return take_finished(channel)
+
+        def worker():
+            while True:
+                item = work_queue.get()
+                try:
+                    if item is None:
+                        return
+                    channel, i, video = item
+                    with self.report.video((video or {}).get('id'), (video or {}).get('title')) as record:
+                        # Число одновременных загрузок ограничивает регулятор запросов
+                        if governor is not None:
+                            with governor.slot():
+                                result = self.process_video(channel, i, video)
+                        else:
+                            result = self.process_video(channel, i, video)
+                        record['result'] = _REPORT_RESULTS.get(result, 'done')
+                    if count_result(channel, i, video, result):
+                        self.close_channel(channel)
+                finally:
+                    work_queue.task_done()
+
+        def run_worker():
+            with self.report.profile_thread():
+                worker()
+
+        workers = [threading.Thread(target=run_worker, daemon=True) for _ in range(max_workers)]
+        for thread in workers:
+            thread.start()
+
+        try:
+            # Этот поток получает списки видео и наполняет очередь загрузки по кругу
+            active = collections.deque()
+            while not self.is_stopped:
+                while len(active) < MAX_ACTIVE_CHANNELS:
+                    channel = next_channel()
+                    if channel is None:
+                        break
+                    channels.append(channel)
+                    active.append(channel)
+                if not active:
+                    break
+
+                channel = active.popleft()
+                try:
+                    item = next(channel.videos, None)
+                except Exception as e:
+                    channel.error = str(e)
+                    self.log(f"Ошибка получения списка видео ({channel.name}): {str(e)}")
+                    item = None
+
+                if item is None:
+                    if channel.error is None and not channel.is_video:
+                        label = f" ({channel.name})" if self.jobs is not None else ""
+                        self.log(f"Список видео получен{label}: {channel.counts['discovered']}")
+                    with lock:
+                        channel.exhausted = True
+                        finished = take_finished(channel)
+                    if finished:
+                        self.close_channel(channel)
+                    continue
+
+                i, video = item
+                with lock:
+                    channel.counts['discovered'] = i
+                    channel.in_flight += 1
+                    totals['discovered'] += 1
+                    self._report_progress(totals['done'], totals['discovered'])
+                work_queue.put((channel, i, video))
+                active.append(channel)
+
+            # Отложенные видео ставятся в конец очереди, когда остальные обработаны
+            for _ in range(THROTTLE_RETRY_ROUNDS):
+                work_queue.join()
+                retry = []
+                with lock:
+                    if not self.is_stopped:
+                        for channel in channels:
+                            retry.extend((channel, i, video) for i, video in channel.deferred)
+                            channel.in_flight += len(channel.deferred)
+                            channel.deferred = []
+                if not retry:
+                    break
+                self.log(f"Повторная загрузка видео, отложенных из-за ограничения запросов: {len(retry)}")
+                for item in retry:
+                    work_queue.put(item)
+            else:
+                work_queue.join()
+        finally:
+            for _ in workers:
+                work_queue.put(None)
+            for thread in workers:
+                thread.join()
+
+            # Каналы, не закрытые из-за остановки, ошибки или оставшихся отложенных видео
+            for channel in channels:
+                with lock:
+                    closing = not channel.closed
+                    channel.closed = True
+                if closing:
+                    self.close_channel(channel)
+
+        if self.is_stopped:
+            self.log("Загрузка прервана пользователем")
+        return sum(channel.counts['success'] for channel in channels)
+
+    def _validate_options(self):
+        """Проверка настроек перед запуском; возвращает список языков"""
+        if self.options.subtitle_format not in SUBTITLE_FORMATS:
+            raise ValueError(f"Неизвестный формат субтитров: {self.options.subtitle_format}")
+
+        languages = self.languages
+        if not languages:
+            raise ValueError("Укажите язык субтитров")
+        return languages
+
+    def _log_settings(self, languages):
+        # Логируем выбранный формат
+        self.log(f"Формат субтитров: {SUBTITLE_FORMAT_LABELS[self.options.subtitle_format]}")
+        if len(languages) > 1:
+            self.log(f"Языки: {', '.join(languages)}")
+
+    def run(self, url):
+        """Загрузка субтитров по ссылке на видео или канал
+
+        Возвращает количество успешно сохраненных субтитров.
+        """
+        url = url.strip()
+        if not url:
+            raise ValueError("Введите URL видео или канала")
+
+        if not validate_url(url):
+            raise ValueError("Неверный URL YouTube")
+
+        languages = self._validate_options()
+
+        def download():
+            self.log("Получение информации о видео/канале...")
+            info, info_from_cache = self.get_video_info_cached(url)
+            if info_from_cache:
+                self.log("Информация о видео/канале взята из кеша")
+            self._log_settings(languages)
+
+            # Канал, плейлист или одно видео (канал из одного видео)
+            return self.download_channel(self.open_channel(url, info, self.options.output_dir, info_from_cache))
+
+        with directory_lock(self.options.output_dir):
+            return self._execute(languages, download)
+
+    def run_batch(self, urls=(), resume=False):
+        """Пакетная загрузка по списку ссылок на видео, каналы и плейлисты
+
+        Ссылки добавляются в очередь заданий папки сохранения; с resume=True
+        вместе с ними обрабатываются незавершенные задания прошлых запусков.
+        Видео разных каналов чередуются (см. download_channels). Во время
+        загрузки ссылки можно добавлять через add_jobs().
+
+        Возвращает количество успешно сохраненных субтитров.
+        """
+        urls = [url.strip() for url in urls if url.strip()]
+        for url in urls:
+            if not validate_url(url):
+                raise ValueError(f"Неверный URL YouTube: {url}")
+
+        languages = self._validate_options()
+
+        output_dir = self.options.output_dir
+
+        def download():
+            self._log_settings(languages)
+            return self.download_channels(self._next_job_channel(output_dir))
+
+        # Очередь заданий и файлы папки меняет только этот запуск
+        with directory_lock(output_dir):
+            self._job_urls = None if resume else set(urls)
+            self.jobs = JobQueue(output_dir)
+            self.jobs.add(urls)
+            counts = self.jobs.counts(self._job_urls)
+            pending = counts.get(JOB_PENDING, 0) + counts.get(JOB_RUNNING, 0)
+            if not pending:
+                self.jobs = None
+                self.log("Очередь заданий пуста")
+                return 0
+            self.log(f"Заданий в очереди: {pending}")
+
+            try:
+                return self._execute(languages, download)
+            finally:
+                counts = self.jobs.counts(self._job_urls)
+                self.jobs = None
+                self.log(f"Заданий выполнено: {counts.get(JOB_DONE, 0)}, с ошибкой: {counts.get(JOB_FAILED, 0)}, "
+                         f"осталось: {counts.get(JOB_PENDING, 0) + counts.get(JOB_RUNNING, 0)}")
+
+    def add_jobs(self, urls):
+        """Добавление ссылок в очередь идущей пакетной загрузки
+
+        Возвращает количество добавленных заданий или None, если пакетная загрузка не идет.
+        """
+        jobs = self.jobs
+        if jobs is None:
+            return None
+        urls = [url.strip() for url in urls if validate_url(url)]
+        if self._job_urls is not None:
+            self._job_urls.update(urls)
+        return jobs.add(urls)
+
+    def _next_job_channel(self, output_dir):
+        """Функция, открывающая канал следующего задания очереди (для download_channels)"""
+        started = set()
+
+        def next_channel():
+            while not self.is_stopped:
+                url = self.jobs.next_pending(exclude=started, only=self._job_urls)
+                if url is None:
+                    return None
+                started.add(url)
+                self.jobs.mark(url, JOB_RUNNING)
+                self.log(f"Задание: {url}")
+                try:
+                    info, info_from_cache = self.get_video_info_cached(url)
+                    return self.open_channel(url, info, output_dir, info_from_cache)
+                except Exception as e:
+                    self.log(f"Ошибка задания {url}: {str(e)}")
+                    self.jobs.mark(url, JOB_FAILED, error=str(e))
+            return None
+
+        return next_channel
+
+    def _execute(self, languages, download):
+        """Запуск download() с отчетом о запуске и общими ресурсами загрузки"""
+        self._stop_event.clear()
+
+        # Создаем папку для сохранения
+        output_dir = self.options.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.report = RunReport(profile=self.options.profile)
+        self.report.start()
+        try:
+            with self.report.profile_thread(), self._session(output_dir, languages):
+                return download()
+        finally:
+            self.report.finish()
+            self.write_report(output_dir)
+
+    def write_report(self, output_dir):
+        """Запись отчета о запуске и краткая сводка по этапам в лог"""
+        path = self.options.report_file or os.path.join(output_dir, REPORT_FILENAME)
+        try:
+            summary = self.report.write(path)
+        except OSError as e:
+            self.log(f"Не удалось записать отчет о запуске: {str(e)}")
+            return
+
+        stages = sorted(summary['stages'].items(), key=lambda item: item[1]['total'], reverse=True)
+        if stages:
+            self.log("Время по этапам: " + ", ".join(f"{name} {stage['total']:.1f} с" for name, stage in stages))
+        self.log(f"Отчет о запуске: {path}")
+
+    @contextmanager
+    def _session(self, output_dir, languages):
+        """Общие ресурсы запуска: сессия yt-dlp, регулятор запросов, пул соединений, индекс, кеш"""
+        self.governor = RequestGovernor(
+            self.options.request_rate, max_concurrency=self.options.max_workers, stop_event=self._stop_event,
+        )
+        with self.create_ydl_session() as self.ydl_session:
+            try:
+                if self.options.in_memory:
+                    # Один пул соединений на все потоки загрузки и дорожки
+                    pool_size = max(1, self.options.max_workers) * len(languages)
+                    self.http_session = create_http_session(pool_size)
+                    if len(languages) > 1:
+                        from concurrent.futures import ThreadPoolExecutor
+                        self.track_executor = ThreadPoolExecutor(max_workers=pool_size)
+
+                if self.options.search_index:
+                    from .search import INDEX_FILENAME, SearchIndex
+                    self.search_index = SearchIndex(os.path.join(output_dir, INDEX_FILENAME))
+                if self.options.cache_ttl > 0:
+                    from .cache import MetadataCache
+                    self.metadata_cache = MetadataCache(
+                        os.path.join(output_dir, CACHE_FILENAME), self.options.cache_ttl, self.options.cache_max_bytes,
+                    )
+                yield
+            finally:
+                self.ydl_session = None
+                if self.governor.throttle_count:
+                    self.log(f"Ограничений запросов со стороны YouTube: {self.governor.throttle_count}")
+                self.governor = None
+                if self.metadata_cache is not None:
+                    if self.metadata_cache.hits:
+                        self.log(f"Запросов из кеша: {self.metadata_cache.hits}")
+                    self.metadata_cache.close()
+                    self.metadata_cache = None
+                if self.track_executor is not None:
+                    self.track_executor.shutdown()
+                    self.track_executor = None
+                if self.search_index is not None:
+                    self.search_index.close()
+                    self.search_index = None
+                if self.http_session is not None:
+                    self.http_session.close()
+                    self.http_session = None
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Запись служебных и итоговых файлов
+
+Файл пишется во временный файл .part рядом и переименовывается только
+целиком: при ошибке или аварийном завершении остается прежняя версия, а не
+обрезанная.
+
+Папку сохранения одновременно может использовать только одна загрузка
+(directory_lock): служебные файлы и архивы папки пишет один процесс.
+"""
+
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+LOCK_FILENAME = '.subtitles.lock'
+
+
+@contextmanager
+def atomic_write(path, mode='w', encoding='utf-8'):
+    """Открытый на запись временный файл, который по завершении блока заменяет path
+
+    При ошибке временный файл удаляется, прежний файл не меняется.
+    """
+    tmp_path = path + '.part'
+    try:
+        with open(tmp_path, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json(path, data, **kwargs):
+    """Атомарная запись JSON (параметры - как у json.dump)"""
+    with atomic_write(path) as f:
+        json.dump(data, f, ensure_ascii=False, **kwargs)
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def directory_lock(directory):
+    """Исключительное использование папки (создается, если ее нет) на время блока
+
+    Если папку уже использует другая загрузка (в том числе в этом же
+    процессе), сразу возникает RuntimeError. Блокировку держит открытый файл
+    LOCK_FILENAME, поэтому после аварийного завершения ее снимает ОС.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILENAME), 'a+b') as f:
+        try:
+            _lock_file(f)
+        except OSError:
+            raise RuntimeError(f"Папка сохранения уже используется другой загрузкой: {directory}") from None
+        try:
+            yield
+        finally:
+            _unlock_file(f)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Очередь заданий пакетной загрузки
+
+Ссылки на видео, каналы и плейлисты из списка сохраняются в папке сохранения
+вместе с состоянием (ожидает, выполняется, готово, ошибка), поэтому прерванный
+пакет продолжается при следующем запуске. Новые ссылки можно добавлять во время
+загрузки: они подхватываются, как только освобождается место для канала.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+
+from .files import write_json
+
+
+JOBS_FILENAME = '.subtitles_jobs.json'
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+_URL_SEPARATOR_RE = re.compile(r'[\s,;]+')
+
+
+def split_urls(text):
+    """Ссылки из строки, разделенные пробелами, запятыми или переводами строк"""
+    return [url for url in _URL_SEPARATOR_RE.split(text.strip()) if url]
+
+
+def read_url_list(path):
+    """Ссылки из файла (по одной на строку, # - комментарий); '-' - стандартный ввод"""
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            lines = f.read().splitlines()
+
+    urls = []
+    for line in lines:
+        if not line.lstrip().startswith('#'):
+            urls.extend(split_urls(line))
+    return urls
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class JobQueue:
+    """Задания пакетной загрузки в файле .subtitles_jobs.json папки сохранения
+
+    Методы можно вызывать из разных потоков (например, добавлять ссылки из
+    интерфейса во время загрузки).
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, JOBS_FILENAME)
+        self._lock = threading.Lock()
+        self._jobs = {}  # URL -> задание, в порядке добавления
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for job in json.load(f).get('jobs', []):
+                        self._jobs[job['url']] = job
+            except (ValueError, KeyError):
+                pass
+
+    def _save(self):
+        write_json(self.path, {'jobs': list(self._jobs.values())}, indent=2)
+
+    def add(self, urls):
+        """Добавление ссылок; завершенные ранее задания ставятся в очередь заново
+
+        Возвращает количество добавленных заданий.
+        """
+        added = 0
+        with self._lock:
+            for url in urls:
+                url = url.strip()
+                job = self._jobs.get(url)
+                if not url or (job is not None and job['status'] in (JOB_PENDING, JOB_RUNNING)):
+                    continue
+                self._jobs[url] = {'url': url, 'status': JOB_PENDING, 'added': _now()}
+                added += 1
+            if added:
+                self._save()
+        return added
+
+    def next_pending(self, exclude=(), only=None):
+        """Первое незавершенное задание, кроме exclude (выполнявшиеся при сбое тоже продолжаются)
+
+        only - если указано, только задания с этими ссылками.
+        """
+        with self._lock:
+            for url, job in self._jobs.items():
+                if job['status'] in (JOB_PENDING, JOB_RUNNING) and url not in exclude and (only is None or url in only):
+                    return url
+        return None
+
+    def mark(self, url, status, **fields):
+        with self._lock:
+            job = self._jobs.setdefault(url, {'url': url, 'added': _now()})
+            job.update(fields, status=status, updated=_now())
+            if status in (JOB_PENDING, JOB_RUNNING):
+                job.pop('error', None)
+            self._save()
+
+    def counts(self, only=None):
+        """Количество заданий по состояниям (only - только задания с этими ссылками)"""
+        with self._lock:
+            counts = {}
+            for url, job in self._jobs.items():
+                if only is None or url in only:
+                    counts[job['status']] = counts.get(job['status'], 0) + 1
+        return counts
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Запись лога загрузки в файл с ротацией
+"""
+
+import logging
+import logging.handlers
+
+LOG_FILENAME = 'subtitles_downloader.log'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+
+def open_log_file(path, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+    """Логгер, пишущий сообщения в файл с ротацией по размеру
+
+    Обработчики logging потокобезопасны, поэтому логгер можно вызывать из рабочих потоков.
+    """
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s', '%Y-%m-%d %H:%M:%S'))
+
+    logger = logging.getLogger(f'ytsubs.file.{id(handler)}')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def close_log_file(logger):
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
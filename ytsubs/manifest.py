@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Журнал загрузок папки канала
+
+Каждая запись - строка JSON (видео, язык, формат, статус, тип дорожки, время).
+Файл только дописывается, поэтому прерванный запуск не портит уже сохраненные
+записи, а повторный запуск пропускает готовые видео без обращения к сети.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+from .files import atomic_write
+
+
+MANIFEST_FILENAME = '.subtitles_manifest.jsonl'
+
+STATUS_DONE = 'done'
+STATUS_NOT_FOUND = 'not_found'
+STATUS_FAILED = 'failed'
+
+
+class DownloadManifest:
+    """Журнал загрузок (JSON Lines) с ключом видео + язык + формат"""
+
+    # Журнал переписывается без устаревших записей, когда их становится слишком много
+    COMPACT_MIN_LINES = 1000
+
+    def __init__(self, directory, output_exists=None):
+        self.directory = directory
+        # Проверка наличия итогового файла по имени (например, в архиве канала)
+        self.output_exists = output_exists or (lambda output: os.path.exists(os.path.join(directory, output)))
+        self.path = os.path.join(directory, MANIFEST_FILENAME)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+        line_count = self._load()
+        if line_count >= self.COMPACT_MIN_LINES and line_count > 2 * len(self._entries):
+            self._compact()
+
+    @staticmethod
+    def _key(video_id, lang, subtitle_format):
+        return video_id, lang, subtitle_format
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return 0
+
+        line_count = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    key = self._key(entry['video_id'], entry['lang'], entry['format'])
+                except (ValueError, KeyError):
+                    # Оборванная последняя строка после аварийного завершения
+                    continue
+                self._entries[key] = entry
+                line_count += 1
+        return line_count
+
+    def _compact(self):
+        with atomic_write(self.path) as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def get(self, video_id, lang, subtitle_format):
+        with self._lock:
+            return self._entries.get(self._key(video_id, lang, subtitle_format))
+
+    def should_skip(self, video_id, lang, subtitle_format, retry_failed=False):
+        """Нужно ли пропустить видео: уже загружено или ранее не удалось (без повтора)"""
+        entry = self.get(video_id, lang, subtitle_format)
+        if entry is None:
+            return False
+
+        if entry['status'] == STATUS_DONE:
+            # Если итоговый файл удалили, загружаем заново
+            output = entry.get('output')
+            return not output or self.output_exists(output)
+
+        return not retry_failed
+
+    def record(self, video_id, lang, subtitle_format, status, track_type=None, output=None, title=None):
+        """Добавление записи о результате обработки видео"""
+        entry = {
+            'video_id': video_id,
+            'lang': lang,
+            'format': subtitle_format,
+            'status': status,
+            'track_type': track_type,
+            'output': output,
+            'title': title,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()  # Запись должна пережить аварийное завершение
+            self._entries[self._key(video_id, lang, subtitle_format)] = entry
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+Время по этапам загрузки и отчет о запуске
+
+Для каждого видео замеряется время этапов (получение списка канала, извлечение
+информации, загрузка дорожек, проверка файлов, конвертация, поисковый индекс,
+вывод лога, ожидание регулятора запросов) и объем загруженных данных. В конце
+запуска отчет записывается в JSON: медиана, 95-й процентиль и максимум по
+каждому этапу, скорость обработки видео и причины неудач.
+
+С профилированием (profile=True) дополнительно собирается cProfile по всем
+рабочим потокам и распределение памяти по tracemalloc; эти модули загружаются
+только при профилировании.
+"""
+
+import heapq
+import io
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from .files import write_json
+
+
+REPORT_FILENAME = '.subtitles_report.json'
+PROFILE_FILENAME = 'subtitles_profile.prof'
+PROFILE_TOP = 30  # Функций в отчете
+# С Python 3.12 cProfile работает через sys.monitoring и одновременно может быть
+# включен только один профилировщик на процесс; раньше у каждого потока был свой
+SINGLE_PROFILER = sys.version_info >= (3, 12)
+MEMORY_TOP = 15  # Мест выделения памяти в отчете
+MAX_VIDEO_RECORDS = 10000  # Замеров по видео в отчете (самые долгие), сводка - по всем видео
+STAGE_SAMPLE_SIZE = 5000  # Длительностей этапа для процентилей (хранится от 1 до 2 таких выборок)
+
+
+def percentile(sorted_values, fraction):
+    """Процентиль по отсортированному списку (ближайший ранг)"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class StageSamples:
+    """Замеры одного этапа: число вызовов, сумма и максимум по всем, процентили - по выборке
+
+    В выборку попадает каждый stride-й вызов; когда она вырастает вдвое больше
+    STAGE_SAMPLE_SIZE, каждый второй элемент отбрасывается и stride удваивается.
+    Память на этап ограничена при любом числе вызовов, а выборка остается
+    равномерной по всему запуску.
+    """
+
+    __slots__ = ('count', 'total', 'max', 'sample', '_stride')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sample = []
+        self._stride = 1
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if (self.count - 1) % self._stride:
+            return
+        self.sample.append(seconds)
+        if len(self.sample) >= STAGE_SAMPLE_SIZE * 2:
+            del self.sample[1::2]
+            self._stride *= 2
+
+
+class RunReport:
+    """Замеры одного запуска загрузки
+
+    Методы вызываются из рабочих потоков; замеры относятся к видео, которое
+    обрабатывает текущий поток (см. video()). Время вложенного этапа (например,
+    extract при получении списка канала или log внутри convert) не входит во
+    время внешнего: каждый этап учитывается один раз.
+    """
+
+    def __init__(self, profile=False):
+        self.profile = profile
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages = {}  # Этап -> StageSamples
+        self._bytes = Counter()
+        self._failures = Counter()
+        self._results = Counter()
+        self._video_count = 0
+        self._videos = []  # Куча (секунды, номер, запись) самых долгих видео
+        self._profiles = []
+        self._profiler = None  # Общий профилировщик запуска (SINGLE_PROFILER)
+        self._memory = None
+        self._started = None
+        self._clock = None
+        self._elapsed = None
+
+    def start(self):
+        self._started = datetime.now()
+        self._clock = time.perf_counter()
+        if self.profile:
+            import tracemalloc
+
+            tracemalloc.start()
+            if SINGLE_PROFILER:
+                self._profiler = self._enable_profiler()
+
+    def finish(self):
+        self._elapsed = time.perf_counter() - self._clock
+        if self._profiler is not None:
+            self._profiler.disable()
+            with self._lock:
+                self._profiles.append(self._profiler)
+            self._profiler = None
+        if self.profile:
+            self._memory = self._memory_stats()
+
+    @staticmethod
+    def _memory_stats():
+        """Пик и места выделения памяти по tracemalloc (трассировка останавливается)"""
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            return None
+        peak = tracemalloc.get_traced_memory()[1]
+        top = tracemalloc.take_snapshot().statistics('lineno')[:MEMORY_TOP]
+        tracemalloc.stop()
+        return {
+            'peak_bytes': peak,
+            'top': [{'where': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count} for stat in top],
+        }
+
+    def _current_video(self):
+        return getattr(self._local, 'video', None)
+
+    def _nested(self):
+        """Стек времени вложенных этапов текущего потока"""
+        stack = getattr(self._local, 'nested', None)
+        if stack is None:
+            stack = self._local.nested = []
+        return stack
+
+    def _record_time(self, stage, seconds):
+        with self._lock:
+            samples = self._stages.get(stage)
+            if samples is None:
+                samples = self._stages[stage] = StageSamples()
+            samples.add(seconds)
+        video = self._current_video()
+        if video is not None:
+            video['stages'][stage] = video['stages'].get(stage, 0.0) + seconds
+
+    def add_bytes(self, stage, count):
+        with self._lock:
+            self._bytes[stage] += count
+        video = self._current_video()
+        if video is not None:
+            video['bytes'][stage] = video['bytes'].get(stage, 0) + count
+
+    def _begin(self):
+        self._nested().append(0.0)
+        return time.perf_counter()
+
+    def _end(self, name, start):
+        elapsed = time.perf_counter() - start
+        stack = self._nested()
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        self._record_time(name, max(0.0, elapsed - nested))
+
+    @contextmanager
+    def stage(self, name):
+        """Замер времени этапа (без вложенных этапов)"""
+        start = self._begin()
+        try:
+            yield
+        finally:
+            self._end(name, start)
+
+    def iter_timed(self, name, iterable):
+        """Элементы итератора с замером времени получения каждого (ленивые списки каналов)"""
+        iterator = iter(iterable)
+        while True:
+            start = self._begin()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._end(name, start)
+            yield item
+
+    @contextmanager
+    def video(self, video_id, title):
+        """Замеры текущего потока относятся к этому видео; результат - в record['result']"""
+        record = {'id': video_id, 'title': title, 'result': None, 'stages': {}, 'bytes': {}}
+        self._local.video = record
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self._local.video = None
+            record['seconds'] = time.perf_counter() - start
+            with self._lock:
+                self._results[record['result']] += 1
+                self._video_count += 1
+                # В отчете остаются MAX_VIDEO_RECORDS самых долгих видео
+                item = (record['seconds'], self._video_count, record)
+                if len(self._videos) < MAX_VIDEO_RECORDS:
+                    heapq.heappush(self._videos, item)
+                else:
+                    heapq.heappushpop(self._videos, item)
+
+    def fail(self, reason):
+        """Причина неудачи текущего видео (или дорожки)"""
+        with self._lock:
+            self._failures[reason] += 1
+        video = self._current_video()
+        if video is not None:
+            video.setdefault('failures', []).append(reason)
+
+    @staticmethod
+    def _enable_profiler():
+        """Включенный профилировщик или None, если включить не удалось (работает другой)"""
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None
+        return profiler
+
+    @contextmanager
+    def profile_thread(self):
+        """cProfile текущего потока, если включено профилирование
+
+        С SINGLE_PROFILER ничего не делает: общий профилировщик включается в
+        start(). Если профилировщик не включился, поток работает без него.
+        """
+        profiler = self._enable_profiler() if self.profile and not SINGLE_PROFILER else None
+        if profiler is None:
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._profiles.append(profiler)
+
+    def _profile_stats(self):
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+
+        import pstats
+
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profiler in profiles[1:]:
+            stats.add(profiler)
+        return stats
+
+    def summary(self):
+        """Сводка запуска (словарь для JSON)"""
+        with self._lock:
+            stages = {
+                stage: (samples.count, samples.total, samples.max, sorted(samples.sample))
+                for stage, samples in self._stages.items()
+            }
+            byte_counts = dict(self._bytes)
+            failures = dict(self._failures.most_common())
+            results = dict(self._results)
+            video_count = self._video_count
+
+        elapsed = self._elapsed if self._elapsed is not None else time.perf_counter() - (self._clock or 0)
+        processed = video_count - results.get('skipped', 0)
+        summary = {
+            'started': self._started.isoformat(timespec='seconds') if self._started else None,
+            'elapsed_seconds': round(elapsed, 3),
+            'videos': video_count,
+            'videos_per_second': round(processed / elapsed, 3) if elapsed > 0 else None,
+            'results': results,
+            'failures': failures,
+            'stages': {
+                stage: {
+                    'count': count,
+                    'total': round(total, 4),
+                    'p50': round(percentile(values, 0.5), 4),
+                    'p95': round(percentile(values, 0.95), 4),
+                    'max': round(maximum, 4),
+                    'bytes': byte_counts.get(stage, 0),
+                }
+                for stage, (count, total, maximum, values) in stages.items()
+            },
+        }
+        if self._memory is not None:
+            summary['memory'] = self._memory
+
+        stats = self._profile_stats()
+        if stats is not None:
+            top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+            summary['profile'] = [
+                {
+                    'function': f"{os.path.basename(filename)}:{line}({name})",
+                    'calls': calls,
+                    'own_seconds': round(own, 4),
+                    'cumulative_seconds': round(cumulative, 4),
+                }
+                for (filename, line, name), (_, calls, own, cumulative, _) in top
+            ]
+        return summary
+
+    def write(self, path):
+        """Запись отчета в JSON (сводка и замеры по видео); при профилировании рядом пишется .prof"""
+        with self._lock:
+            # В порядке завершения
+            videos = [record for _, _, record in sorted(self._videos, key=lambda item: item[1])]
+        report = self.summary()
+        if len(videos) < report['videos']:
+            report['per_video_note'] = (
+                f"Показаны {len(videos)} самых долгих видео из {report['videos']} (MAX_VIDEO_RECORDS)"
+            )
+        report['per_video'] = [
+            dict(video, seconds=round(video['seconds'], 4),
+                 stages={stage: round(seconds, 4) for stage, seconds in video['stages'].items()})
+            for video in videos
+        ]
+
+        write_json(path, report, indent=2)
+
+        stats = self._profile_stats()
+        if stats is not None:
+            stats.dump_stats(os.path.join(os.path.dirname(path) or '.', PROFILE_FILENAME))
+        return report
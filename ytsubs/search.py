@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Полнотекстовый поиск по загруженным субтитрам
+
+Каждая фраза субтитров добавляется в индекс SQLite FTS5 вместе с каналом,
+видео, языком и временем начала. Индекс один на папку сохранения и
+обновляется сразу после сохранения субтитров каждого видео, а поиск
+возвращает видео со ссылками на нужный момент.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+
+from .columnar import ARCHIVE_FILENAME, CueArchive
+
+
+INDEX_FILENAME = 'subtitles_index.sqlite'
+
+# rowid фразы = номер видео << CUE_ROWID_BITS | номер фразы: фразы видео удаляются по диапазону rowid
+CUE_ROWID_BITS = 20
+MAX_CUES_PER_VIDEO = 1 << CUE_ROWID_BITS
+
+QUERY_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SearchHit = namedtuple('SearchHit', ['channel', 'video_id', 'lang', 'title', 'start_ms', 'snippet', 'url'])
+
+
+def video_url(video_id, start_ms=None):
+    """Ссылка на видео с переходом к нужной секунде"""
+    url = f"https://www.youtube.com/watch?v={video_id}"
+    if start_ms:
+        url += f"&t={start_ms // 1000}s"
+    return url
+
+
+def quote_query(text):
+    """Запрос из обычных слов: все слова должны встретиться, спецсимволы FTS5 не действуют"""
+    return ' '.join(f'"{token}"' for token in QUERY_TOKEN_RE.findall(text))
+
+
+class SearchIndex:
+    """Индекс фраз субтитров (SQLite FTS5)
+
+    Методы можно вызывать из рабочих потоков загрузки.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        try:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._create_schema()
+        except sqlite3.OperationalError as e:
+            self._db.close()
+            if 'fts5' in str(e):
+                raise RuntimeError("SQLite собран без поддержки FTS5, поисковый индекс недоступен") from None
+            raise
+
+    def _create_schema(self):
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS videos ('
+                'id INTEGER PRIMARY KEY, channel TEXT, video_id TEXT NOT NULL, lang TEXT NOT NULL, title TEXT, '
+                'UNIQUE (video_id, lang))'
+            )
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS cues USING fts5("
+                "text, start_ms UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def add_video(self, channel, video_id, lang, title, cues):
+        """Добавление (или замена) фраз одного видео, одной транзакцией"""
+        rows = []
+        for cue in cues:
+            if len(rows) == MAX_CUES_PER_VIDEO:
+                break
+            rows.append((' '.join(cue.lines), cue.start_ms))
+
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT INTO videos (channel, video_id, lang, title) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (video_id, lang) DO UPDATE SET channel = excluded.channel, title = excluded.title',
+                (channel, video_id, lang, title),
+            )
+            video_pk, = self._db.execute(
+                'SELECT id FROM videos WHERE video_id = ? AND lang = ?', (video_id, lang)
+            ).fetchone()
+
+            first_rowid = video_pk << CUE_ROWID_BITS
+            self._db.execute(
+                'DELETE FROM cues WHERE rowid BETWEEN ? AND ?', (first_rowid, first_rowid + MAX_CUES_PER_VIDEO - 1)
+            )
+            self._db.executemany(
+                'INSERT INTO cues (rowid, text, start_ms) VALUES (?, ?, ?)',
+                ((first_rowid + i, text, start_ms) for i, (text, start_ms) in enumerate(rows)),
+            )
+
+    def search(self, query, limit=20, channel=None, lang=None, raw=False):
+        """Поиск фраз: список SearchHit, самые релевантные первыми
+
+        Без raw запрос разбивается на слова, которые должны встретиться все;
+        с raw передается в FTS5 как есть (OR, NEAR, "фраза", префикс*).
+        """
+        match = query if raw else quote_query(query)
+        if not match:
+            return []
+
+        sql = (
+            'SELECT v.channel, v.video_id, v.lang, v.title, c.start_ms, '
+            "snippet(cues, 0, '[', ']', '…', 12) "
+            f'FROM cues c JOIN videos v ON v.id = (c.rowid >> {CUE_ROWID_BITS}) '
+            'WHERE cues MATCH ?'
+        )
+        params = [match]
+        if channel:
+            sql += ' AND v.channel = ?'
+            params.append(channel)
+        if lang:
+            sql += ' AND v.lang = ?'
+            params.append(lang)
+        sql += ' ORDER BY rank LIMIT ?'
+        params.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [SearchHit(*row, video_url(row[1], row[4])) for row in rows]
+
+    def stats(self):
+        """Количество видео и фраз в индексе"""
+        with self._lock:
+            videos, = self._db.execute('SELECT count(*) FROM videos').fetchone()
+            cues, = self._db.execute('SELECT count(*) FROM cues').fetchone()
+        return videos, cues
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def index_archives(index, directory, log=None):
+    """Добавление в индекс сводных файлов каналов (subtitles.cues) из папки
+
+    Название канала берется из сводного файла (то же, что при индексации во
+    время загрузки), для старых файлов - имя папки. Возвращает количество видео.
+    """
+    log = log or (lambda message: None)
+    count = 0
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        if ARCHIVE_FILENAME not in filenames:
+            continue
+
+        folder = os.path.basename(dirpath)
+        with CueArchive(os.path.join(dirpath, ARCHIVE_FILENAME)) as archive:
+            for video in archive.videos:
+                cues = archive.iter_cues(video['id'], video['lang'])
+                index.add_video(video.get('channel') or folder, video['id'], video['lang'], video['title'], cues)
+                count += 1
+        log(f"Канал {folder}: видео в индексе {len(archive.videos)}")
+    return count
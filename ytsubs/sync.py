@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Состояние синхронизации каналов
+
+Для каждого канала запоминаются последние увиденные видео и дата самой новой
+загрузки. При синхронизации перечисление видео канала останавливается на первом
+уже известном видео, поэтому ежедневный запуск обрабатывает только новые видео.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+from .files import write_json
+
+
+SYNC_STATE_FILENAME = '.subtitles_sync.json'
+
+# Сколько последних ID хранить: закрепленные или удаленные видео не должны ломать остановку
+KNOWN_IDS_LIMIT = 50
+
+
+def channel_key(url):
+    """Ключ канала в файле состояния"""
+    return url.strip().rstrip('/')
+
+
+class ChannelSyncState:
+    """Последние известные видео одного канала"""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.known_ids = list(data.get('known_ids', []))
+        self.last_upload_date = data.get('last_upload_date')
+        self._known = set(self.known_ids)
+        # Видео, найденные в текущем запуске; сохраняются только после его завершения
+        self._new_ids = []
+        self._newest_upload_date = None
+        # Перечисление дошло до известного видео или до конца списка (не обрезано ограничением)
+        self.caught_up = False
+
+    @property
+    def is_empty(self):
+        return not self.known_ids
+
+    def is_known(self, entry):
+        """Дошло ли перечисление до видео, обработанного в прошлый раз"""
+        if entry.get('id') in self._known:
+            return True
+
+        # Даты в плоском списке есть не всегда, поэтому это только дополнительная проверка
+        upload_date = entry.get('upload_date')
+        return bool(upload_date and self.last_upload_date and upload_date < self.last_upload_date)
+
+    def observe(self, entry):
+        """Учет нового видео из списка канала (в порядке от новых к старым)"""
+        if entry.get('id') and len(self._new_ids) < KNOWN_IDS_LIMIT:
+            self._new_ids.append(entry['id'])
+
+        upload_date = entry.get('upload_date')
+        if upload_date and (self._newest_upload_date is None or upload_date > self._newest_upload_date):
+            self._newest_upload_date = upload_date
+
+    def commit(self):
+        """Запоминание учтенных видео после успешного запуска
+
+        Если список обрезан ограничением раньше, чем дошел до известных видео,
+        отметка не сдвигается: иначе видео между обработанными и прошлыми были
+        бы пропущены навсегда. Возвращает, сдвинута ли отметка.
+        """
+        if not self.caught_up and not self.is_empty:
+            self._new_ids = []
+            self._newest_upload_date = None
+            return False
+
+        new_id_set = set(self._new_ids)
+        self.known_ids = (self._new_ids + [i for i in self.known_ids if i not in new_id_set])[:KNOWN_IDS_LIMIT]
+        self._known = set(self.known_ids)
+        if self._newest_upload_date and (not self.last_upload_date or self._newest_upload_date > self.last_upload_date):
+            self.last_upload_date = self._newest_upload_date
+
+        self._new_ids = []
+        self._newest_upload_date = None
+        return True
+
+    def to_dict(self):
+        return {
+            'last_video_id': self.known_ids[0] if self.known_ids else None,
+            'last_upload_date': self.last_upload_date,
+            'known_ids': self.known_ids,
+            'updated': datetime.now().isoformat(timespec='seconds'),
+        }
+
+
+class SyncStateStore:
+    """Файл состояния синхронизации в папке сохранения"""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, SYNC_STATE_FILENAME)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def get(self, url):
+        with self._lock:
+            return ChannelSyncState(self._load().get(channel_key(url)))
+
+    def save(self, url, state):
+        """Атомарная запись состояния канала (временный файл + переименование)"""
+        with self._lock:
+            data = self._load()
+            data[channel_key(url)] = state.to_dict()
+
+            write_json(self.path, data, indent=2)
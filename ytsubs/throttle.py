@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Регулятор запросов к YouTube
+
+При большом количестве запросов YouTube начинает отвечать HTTP 429 или пустыми
+ответами. Все запросы запуска проходят через общий регулятор: число запросов в
+секунду ограничено (token bucket), после ограничения со стороны YouTube все
+потоки делают паузу с экспоненциально растущей длительностью и случайным
+разбросом, а число параллельных загрузок уменьшается вдвое и затем постепенно
+восстанавливается, пока запросы проходят успешно (AIMD).
+"""
+
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_REQUEST_RATE = 5.0  # Запросов в секунду
+DEFAULT_INCREASE_AFTER = 20  # Успешных запросов подряд до увеличения числа параллельных загрузок
+BACKOFF_BASE = 2.0  # Секунды
+BACKOFF_CAP = 300.0
+
+# Ответы, после которых запросы нужно замедлить
+THROTTLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+_HTTP_ERROR_RE = re.compile(r'HTTP Error (\d{3})')
+
+
+class ThrottledError(Exception):
+    """YouTube ограничил запросы (429, 5xx или пустой ответ)"""
+
+
+def _exception_chain(exc):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        # Ошибки yt-dlp хранят исходную ошибку в exc_info
+        exc_info = getattr(exc, 'exc_info', None)
+        exc = exc.__cause__ or exc.__context__ or (exc_info[1] if exc_info else None)
+
+
+def is_throttling_error(exc):
+    """Является ли ошибка ограничением запросов со стороны сервера"""
+    for error in _exception_chain(exc):
+        if isinstance(error, ThrottledError):
+            return True
+        status = getattr(error, 'status', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+        if status in THROTTLE_STATUS_CODES:
+            return True
+        # yt-dlp часто передает только текст ошибки
+        message = str(error)
+        match = _HTTP_ERROR_RE.search(message)
+        if (match and int(match.group(1)) in THROTTLE_STATUS_CODES) or 'Too Many Requests' in message:
+            return True
+    return False
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Пауза перед повтором: экспоненциальный рост со случайным разбросом (full jitter)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Ограничение частоты запросов: rate в секунду, до burst подряд; rate <= 0 - без ограничения"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Занимает токен и возвращает, сколько секунд нужно подождать до запроса"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RequestGovernor:
+    """Общий для запуска регулятор запросов и числа параллельных загрузок
+
+    Методы вызываются из рабочих потоков. Ожидание прерывается событием stop_event.
+    """
+
+    def __init__(self, rate=DEFAULT_REQUEST_RATE, max_concurrency=4, min_concurrency=1,
+                 increase_after=DEFAULT_INCREASE_AFTER, stop_event=None):
+        self.bucket = TokenBucket(rate)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.concurrency = self.max_concurrency  # Текущий предел параллельных загрузок
+        self.increase_after = increase_after
+        self.throttle_count = 0
+        self._stop_event = stop_event or threading.Event()
+        self._cond = threading.Condition()
+        self._active = 0
+        self._successes = 0
+        self._failures = 0  # Ограничений подряд, определяет длительность паузы
+        self._paused_until = 0.0
+
+    def _wait(self, seconds):
+        """Ожидание; True, если загрузка остановлена"""
+        return self._stop_event.wait(seconds)
+
+    def request(self):
+        """Ожидание разрешения на один запрос: пауза после ограничения и токен"""
+        while True:
+            with self._cond:
+                delay = self._paused_until - time.monotonic()
+            if delay <= 0:
+                break
+            if self._wait(delay):
+                return
+
+        delay = self.bucket.reserve()
+        if delay > 0:
+            self._wait(delay)
+
+    @contextmanager
+    def slot(self):
+        """Место одной параллельной загрузки (их число меняется регулятором)"""
+        with self._cond:
+            while self._active >= self.concurrency and not self._stop_event.is_set():
+                self._cond.wait(0.5)
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def on_success(self):
+        """Учет успешного запроса; возвращает новый предел, если он увеличен"""
+        with self._cond:
+            self._failures = 0
+            self._successes += 1
+            if self._successes < self.increase_after or self.concurrency >= self.max_concurrency:
+                return None
+            self._successes = 0
+            self.concurrency += 1
+            self._cond.notify_all()
+            return self.concurrency
+
+    def on_throttled(self):
+        """Учет ограничения: пауза для всех потоков и уменьшение предела вдвое
+
+        Возвращает длительность паузы или None, если пауза уже идет (ответы на
+        запросы, отправленные до нее, не уменьшают предел повторно).
+        """
+        with self._cond:
+            self.throttle_count += 1
+            self._successes = 0
+            now = time.monotonic()
+            if now < self._paused_until:
+                return None
+            delay = backoff_delay(self._failures)
+            self._failures += 1
+            self._paused_until = now + delay
+            self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            return delay
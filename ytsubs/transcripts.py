@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Сжатый архив субтитров канала вместо отдельных файлов
+
+Итоговые тексты всех видео канала дописываются в несколько больших файлов
+(шардов) transcripts-NNNN.jsonl.gz: каждый текст - отдельный gzip-поток с
+одной строкой JSON (имя, видео, язык, название, формат, текст). Шард целиком -
+обычный .jsonl.gz, его можно прочитать через zcat. Индекс transcripts.idx.json
+хранит для каждого имени шард, смещение и длину, поэтому один текст читается
+без распаковки всего архива (TranscriptArchive).
+
+Тексты дописываются в конец последнего шарда (gzip допускает несколько
+потоков подряд), пока он меньше SHARD_MAX_BYTES, в том числе в следующих
+запусках. Читатели видят только тексты из индекса, а индекс атомарно
+переписывается после того, как данные записаны на диск, поэтому недописанных
+данных никто не видит. Журнал .part с записями, еще не внесенными в индекс,
+позволяет после аварийного завершения сохранить уже дописанные тексты.
+"""
+
+import gzip
+import json
+import os
+import re
+import threading
+
+from .files import write_json
+
+
+INDEX_FILENAME = 'transcripts.idx.json'
+JOURNAL_FILENAME = 'transcripts.idx.part'
+SHARD_TEMPLATE = 'transcripts-{:04d}.jsonl.gz'
+SHARD_MAX_BYTES = 64 * 1024 * 1024
+FORMAT_VERSION = 1
+
+_SHARD_RE = re.compile(r'^transcripts-(\d{4,})\.jsonl\.gz(\.part)?$')
+
+
+def _load_index(directory):
+    path = os.path.join(directory, INDEX_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    if index.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия архива субтитров: {index.get('version')}")
+    return index['entries']
+
+
+def has_archive(directory):
+    return os.path.exists(os.path.join(directory, INDEX_FILENAME))
+
+
+class TranscriptArchiveWriter:
+    """Запись текстов канала в сжатый архив по мере загрузки
+
+    Методы можно вызывать из рабочих потоков. Текст с уже существующим именем
+    заменяет прежний (старые данные остаются в шарде, но не видны через индекс).
+    """
+
+    def __init__(self, directory, shard_max_bytes=SHARD_MAX_BYTES):
+        self.directory = directory
+        self.shard_max_bytes = shard_max_bytes
+        self._lock = threading.Lock()
+        self._entries = _load_index(directory)
+        self._pending = {}  # Записи недописанного шарда
+        self._shard = None
+        self._shard_name = None
+        self._shard_size = 0
+        self._journal = None
+        self._recover()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _shard_numbers(self):
+        return [int(match.group(1)) for match in map(_SHARD_RE.match, os.listdir(self.directory)) if match]
+
+    def _write_index(self):
+        shards = sorted({entry['shard'] for entry in self._entries.values()})
+        write_json(self._path(INDEX_FILENAME), {'version': FORMAT_VERSION, 'shards': shards, 'entries': self._entries})
+
+    def _recover(self):
+        """Восстановление после аварийного завершения
+
+        Тексты из журнала (они дописаны в шард полностью) вносятся в индекс, хвост
+        шарда после последнего известного текста отбрасывается. Шарды .part,
+        оставшиеся от прежних версий архива, завершаются так же.
+        """
+        journal_path = self._path(JOURNAL_FILENAME)
+        recovered = {}
+        if os.path.exists(journal_path):
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Оборванная последняя строка
+                        continue
+                    recovered[record.pop('name')] = record
+
+        for filename in sorted(os.listdir(self.directory)):
+            match = _SHARD_RE.match(filename)
+            if not match:
+                continue
+            shard_name = filename[:-len('.part')] if match.group(2) else filename
+            path = self._path(filename)
+            size = os.path.getsize(path)
+            entries = {
+                name: entry for name, entry in recovered.items()
+                if entry['shard'] == shard_name and entry['offset'] + entry['length'] <= size
+            }
+            self._entries.update(entries)
+            end = max(
+                (entry['offset'] + entry['length'] for entry in self._entries.values() if entry['shard'] == shard_name),
+                default=0,
+            )
+            if not end:
+                os.remove(path)
+                continue
+            if size > end:
+                with open(path, 'r+b') as f:
+                    f.truncate(end)
+            if match.group(2):
+                os.replace(path, self._path(shard_name))
+
+        if recovered:
+            self._write_index()
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._pending or name in self._entries
+
+    def add(self, name, text, **meta):
+        """Добавление текста под именем name (имя итогового файла) с метаданными"""
+        record = dict(meta, name=name, text=text)
+        member = gzip.compress((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'), mtime=0)
+
+        with self._lock:
+            if self._shard is None:
+                self._open_shard()
+
+            entry = dict(meta, shard=self._shard_name, offset=self._shard_size, length=len(member))
+            self._shard.write(member)
+            self._shard.flush()
+            # Запись в журнал - после данных: все, что в журнале, дописано в шард полностью
+            self._journal.write(json.dumps(dict(entry, name=name), ensure_ascii=False) + '\n')
+            self._journal.flush()
+            self._pending[name] = entry
+            self._shard_size += len(member)
+
+            if self._shard_size >= self.shard_max_bytes:
+                self._finish_shard()
+
+    def _open_shard(self):
+        """Дописывание последнего шарда, пока он меньше shard_max_bytes, иначе - новый шард"""
+        number = max(self._shard_numbers(), default=0)
+        if not number or os.path.getsize(self._path(SHARD_TEMPLATE.format(number))) >= self.shard_max_bytes:
+            number += 1
+        self._shard_name = SHARD_TEMPLATE.format(number)
+        path = self._path(self._shard_name)
+        self._shard_size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._shard = open(path, 'ab')
+        self._journal = open(self._path(JOURNAL_FILENAME), 'a', encoding='utf-8')
+
+    def _finish_shard(self):
+        # Журнал удаляется только после записи индекса: до этого тексты восстанавливаются по нему
+        self._shard.flush()
+        os.fsync(self._shard.fileno())
+        self._shard.close()
+        self._shard = None
+
+        self._entries.update(self._pending)
+        self._pending = {}
+        self._write_index()
+
+        self._journal.close()
+        self._journal = None
+        os.remove(self._path(JOURNAL_FILENAME))
+
+    def close(self):
+        with self._lock:
+            if self._shard is not None:
+                self._finish_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TranscriptArchive:
+    """Чтение архива субтитров канала: любой текст - без распаковки остальных"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not has_archive(directory):
+            raise FileNotFoundError(f"Архив субтитров не найден: {os.path.join(directory, INDEX_FILENAME)}")
+        self.entries = _load_index(directory)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def names(self):
+        return list(self.entries)
+
+    def find(self, video_id, lang=None):
+        """Имена текстов видео (на языке lang, если указан)"""
+        return [
+            name for name, entry in self.entries.items()
+            if entry.get('video_id') == video_id and (lang is None or entry.get('lang') == lang)
+        ]
+
+    def read_record(self, name):
+        """Запись текста: имя, метаданные и текст"""
+        entry = self.entries[name]
+        with open(os.path.join(self.directory, entry['shard']), 'rb') as f:
+            f.seek(entry['offset'])
+            member = f.read(entry['length'])
+        return json.loads(gzip.decompress(member))
+
+    def read(self, name):
+        return self.read_record(name)['text']
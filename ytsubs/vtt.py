@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+Конвертация субтитров WebVTT в текст и структурированные форматы
+
+Файл читается построчно: блоки субтитров выделяются по пустым строкам и
+сразу записываются в результат, поэтому длинные субтитры (многочасовые
+трансляции) не загружаются в память целиком.
+
+Повторы убираются только внутри скользящего окна времени: так "бегущая" строка
+автоматических субтитров YouTube не дублируется, а настоящие повторы в речи
+сохраняются.
+
+Форматы результата перечислены в OUTPUT_FORMATS: текст с таймингами и без,
+SRT и JSON Lines (одна фраза на строку, время в миллисекундах).
+"""
+
+import io
+import json
+import re
+from collections import OrderedDict, namedtuple
+
+from .files import atomic_write
+
+
+CUE_NUMBER_RE = re.compile(r'^\d+$')
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+HTML_ENTITY_RE = re.compile(r'&[a-zA-Z]+;')
+TIMESTAMP_RE = re.compile(r'\s*(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{3})')
+
+SENTENCE_ENDINGS = ('.', '!', '?')
+
+# Повторы строк ищутся только внутри этого окна (секунды)
+DEFAULT_DEDUP_WINDOW = 10.0
+DEDUP_MAX_LINES = 1000
+# Сколько слов должно совпасть, чтобы считать начало строки повтором конца предыдущей
+DEDUP_MIN_OVERLAP_WORDS = 3
+
+# Фраза субтитров: начало и конец в миллисекундах (None, если у блока нет времени) и строки текста
+Cue = namedtuple('Cue', ['start_ms', 'end_ms', 'lines'])
+
+
+def iter_blocks(lines):
+    """Группировка строк в блоки, разделенные пустыми строками
+
+    Строка из пробелов сразу после временной метки не завершает блок: так
+    YouTube оформляет первую строку автоматических субтитров.
+    """
+    block = []
+    for line in lines:
+        line = line.rstrip('\n')
+        if line.strip():
+            block.append(line)
+        elif block and not (line and '-->' in block[-1]):
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def parse_timestamp(value):
+    """Время VTT (ЧЧ:ММ:СС.ммм или ММ:СС.ммм) в миллисекундах, None если не распознано"""
+    match = TIMESTAMP_RE.match(value)
+    if not match:
+        return None
+    hours, minutes, seconds, milliseconds = match.groups()
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(milliseconds)
+
+
+def parse_time_line(time_line):
+    """Начало и конец блока в миллисекундах из строки '00:00:01.000 --> 00:00:02.500'"""
+    start, _, end = time_line.partition('-->')
+    return parse_timestamp(start), parse_timestamp(end)
+
+
+def format_clock(ms):
+    """Время ЧЧ:ММ:СС без миллисекунд"""
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    return f"{hours:02d}:{minutes:02d}:{ms // 1000:02d}"
+
+
+def format_srt_timestamp(ms):
+    """Время в формате SRT: ЧЧ:ММ:СС,ммм"""
+    return f"{format_clock(ms)},{ms % 1000:03d}"
+
+
+def iter_raw_cues(lines):
+    """Разбор блоков VTT в Cue с очищенными строками текста"""
+    for block in iter_blocks(lines):
+        # Пропускаем заголовки
+        first_line = block[0].lstrip()
+        if first_line.startswith('WEBVTT') or first_line.startswith('NOTE'):
+            continue
+
+        time_line = None
+        subtitle_lines = []
+
+        # Ищем строки с текстом и временные метки
+        for line in block:
+            line = line.strip()
+
+            # Находим временную метку
+            if '-->' in line:
+                time_line = line
+                continue
+
+            # Пропускаем номера
+            if CUE_NUMBER_RE.match(line):
+                continue
+
+            # Удаляем HTML теги и форматирование
+            clean_line = HTML_TAG_RE.sub('', line)
+            clean_line = HTML_ENTITY_RE.sub('', clean_line)  # HTML entities
+            clean_line = clean_line.strip()
+
+            if clean_line:
+                subtitle_lines.append(clean_line)
+
+        if subtitle_lines:
+            start_ms, end_ms = parse_time_line(time_line) if time_line else (None, None)
+            yield Cue(start_ms, end_ms, subtitle_lines)
+
+
+def overlap_length(previous_words, words):
+    """Длина самого длинного конца previous_words, с которого начинается words
+
+    Префикс-функция (Кнут-Моррис-Пратт) по words + разделитель + конец previous_words:
+    время линейное от длины новой строки.
+    """
+    tail = previous_words[-len(words):] if words else []
+    sequence = words + [None] + tail
+    prefix = [0] * len(sequence)
+    for i in range(1, len(sequence)):
+        k = prefix[i - 1]
+        while k and sequence[i] != sequence[k]:
+            k = prefix[k - 1]
+        if sequence[i] == sequence[k]:
+            k += 1
+        prefix[i] = k
+    return prefix[-1] if tail else 0
+
+
+def dedup_cues(cues, dedup_window=DEFAULT_DEDUP_WINDOW):
+    """Удаление повторов в пределах окна времени (в секундах)
+
+    Строка пропускается, если такая же строка встречалась не раньше чем за
+    dedup_window секунд до начала блока. Если новая строка начинается с конца
+    предыдущей ("бегущая" строка автоматических субтитров), повторенные слова
+    отбрасываются. Память ограничена строками внутри окна (не больше
+    DEDUP_MAX_LINES), поэтому повторы вне окна (припев, "Да.") сохраняются.
+    """
+    if dedup_window <= 0:
+        yield from cues
+        return
+
+    window_ms = dedup_window * 1000
+    recent = OrderedDict()  # Строка -> когда встречалась последний раз, от старых к новым
+    previous_line = ''  # Последняя показанная строка
+    previous_ms = None
+    current_ms = 0
+
+    for cue in cues:
+        # Блоки без временной метки считаем одновременными с предыдущим
+        if cue.start_ms is not None:
+            current_ms = cue.start_ms
+
+        while recent and (current_ms - next(iter(recent.values())) > window_ms or len(recent) > DEDUP_MAX_LINES):
+            recent.popitem(last=False)
+        in_window = previous_ms is not None and current_ms - previous_ms <= window_ms
+
+        new_lines = []
+        for line in cue.lines:
+            if line in recent:
+                recent.move_to_end(line)
+            else:
+                words = line.split()
+                overlap = 0
+                # Слова сравниваем, только если первое слово вообще есть в предыдущей строке
+                if in_window and words[0] in previous_line:
+                    previous_words = previous_line.split()
+                    overlap = overlap_length(previous_words, words)
+                    # Короткое совпадение засчитывается, только если повторена вся предыдущая строка
+                    if overlap < DEDUP_MIN_OVERLAP_WORDS and overlap != len(previous_words):
+                        overlap = 0
+
+                if not overlap:
+                    new_lines.append(line)
+                elif words[overlap:]:
+                    new_lines.append(' '.join(words[overlap:]))
+
+            recent[line] = current_ms
+            previous_line = line
+            previous_ms = current_ms
+            in_window = True
+
+        if new_lines:
+            yield cue._replace(lines=new_lines)
+
+
+def iter_cues(lines, dedup_window=DEFAULT_DEDUP_WINDOW):
+    """Разбор блоков VTT в Cue
+
+    Повторы строк в пределах окна времени пропускаются.
+    """
+    return dedup_cues(iter_raw_cues(lines), dedup_window)
+
+
+def iter_text_lines(cues, subtitle_format="with_timings"):
+    """Строки итогового текста для каждого блока субтитров"""
+    for cue in cues:
+        if subtitle_format == "with_timings" and cue.start_ms is not None:
+            # Начальное время без миллисекунд для лучшей читаемости
+            yield f"[{format_clock(cue.start_ms)}] {' '.join(cue.lines)}"
+        else:
+            # Без таймингов - просто текст
+            yield ' '.join(cue.lines)
+
+
+def iter_paragraphs(text_lines):
+    """Объединение строк в абзацы по 2-3 строки или до конца предложения"""
+    current_paragraph = []
+
+    for line in text_lines:
+        current_paragraph.append(line)
+
+        if len(current_paragraph) >= 2 and (line.endswith(SENTENCE_ENDINGS) or len(current_paragraph) >= 3):
+            yield ' '.join(current_paragraph)
+            current_paragraph = []
+
+    # Добавляем оставшиеся строки
+    if current_paragraph:
+        yield ' '.join(current_paragraph)
+
+
+def write_text(cues, f, subtitle_format="with_timings"):
+    """Текст: с таймингами каждая строка с временной меткой, без таймингов - абзацы"""
+    text_lines = iter_text_lines(cues, subtitle_format)
+    if subtitle_format == "with_timings":
+        separator = '\n'
+    else:
+        text_lines = iter_paragraphs(text_lines)
+        separator = '\n\n'
+
+    for i, text in enumerate(text_lines):
+        if i:
+            f.write(separator)
+        f.write(text)
+
+
+def write_srt(cues, f, subtitle_format="srt"):
+    """SRT: нумерованные блоки с началом и концом; блоки без времени пропускаются"""
+    index = 0
+    for cue in cues:
+        if cue.start_ms is None:
+            continue
+        end_ms = cue.end_ms if cue.end_ms is not None else cue.start_ms
+        index += 1
+        if index > 1:
+            f.write('\n')
+        f.write(f"{index}\n{format_srt_timestamp(cue.start_ms)} --> {format_srt_timestamp(end_ms)}\n")
+        f.write('\n'.join(cue.lines) + '\n')
+
+
+def write_jsonl(cues, f, subtitle_format="jsonl"):
+    """JSON Lines: одна фраза на строку, начало и конец в миллисекундах"""
+    for cue in cues:
+        record = {'start_ms': cue.start_ms, 'end_ms': cue.end_ms, 'text': '\n'.join(cue.lines)}
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+# Формат -> (окончание имени файла, функция записи)
+OUTPUT_FORMATS = {
+    'with_timings': ('.with_timings.txt', write_text),
+    'without_timings': ('.txt', write_text),
+    'srt': ('.srt', write_srt),
+    'jsonl': ('.jsonl', write_jsonl),
+}
+
+SUBTITLE_FORMATS = tuple(OUTPUT_FORMATS)
+
+SUBTITLE_FORMAT_LABELS = {
+    'with_timings': "с таймингами",
+    'without_timings': "без таймингов",
+    'srt': "SRT",
+    'jsonl': "JSON Lines",
+}
+
+
+def _observe_cues(cues, on_cue):
+    for cue in cues:
+        on_cue(cue)
+        yield cue
+
+
+def write_cues(cues, f, subtitle_format="with_timings"):
+    """Запись уже разобранных фраз (например, фрагмента CueTable) в выбранном формате"""
+    if subtitle_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Неизвестный формат субтитров: {subtitle_format}")
+
+    writer = OUTPUT_FORMATS[subtitle_format][1]
+    writer(cues, f, subtitle_format)
+
+
+def write_txt(lines, f, subtitle_format="with_timings", dedup_window=DEFAULT_DEDUP_WINDOW, on_cue=None):
+    """Запись субтитров в выбранном формате по мере разбора
+
+    Если передана функция on_cue, она получает каждую записанную фразу
+    (например, для сводного файла канала).
+    """
+    if subtitle_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Неизвестный формат субтитров: {subtitle_format}")
+
+    cues = iter_cues(lines, dedup_window)
+    if on_cue is not None:
+        cues = _observe_cues(cues, on_cue)
+    write_cues(cues, f, subtitle_format)
+
+
+def render_txt(lines, subtitle_format="with_timings", dedup_window=DEFAULT_DEDUP_WINDOW, on_cue=None):
+    """Результат конвертации строкой (для записи в архив канала)"""
+    dst = io.StringIO()
+    write_txt(lines, dst, subtitle_format, dedup_window, on_cue)
+    return dst.getvalue()
+
+
+def get_output_suffix(subtitle_format):
+    """Окончание имени итогового файла: .with_timings.txt, .txt, .srt или .jsonl"""
+    return OUTPUT_FORMATS[subtitle_format][0]
+
+
+def get_txt_path(vtt_file, subtitle_format="with_timings"):
+    """Путь результата рядом с VTT: Video.ru.vtt -> Video.ru.with_timings.txt, Video.ru.srt и т.д."""
+    base = vtt_file[:-4] if vtt_file.lower().endswith('.vtt') else vtt_file
+    return base + get_output_suffix(subtitle_format)
+
+
+def write_txt_file(lines, txt_file, subtitle_format="with_timings", dedup_window=DEFAULT_DEDUP_WINDOW, on_cue=None):
+    """Запись результата через временный файл, чтобы при ошибке не оставить обрезанный текст"""
+    with atomic_write(txt_file) as dst:
+        write_txt(lines, dst, subtitle_format, dedup_window, on_cue)
+
+
+def convert_vtt_to_txt(vtt_file, txt_file, subtitle_format="with_timings", dedup_window=DEFAULT_DEDUP_WINDOW,
+                       on_cue=None):
+    """Конвертация VTT в текст с таймингами или без, SRT или JSON Lines"""
+    with open(vtt_file, 'r', encoding='utf-8') as src:
+        write_txt_file(src, txt_file, subtitle_format, dedup_window, on_cue)
+
+
+def open_vtt_bytes(data):
+    """Строки VTT из байтов в памяти"""
+    # TextIOWrapper дает те же переводы строк, что и чтение файла
+    return io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')